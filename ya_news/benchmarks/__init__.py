@@ -0,0 +1,37 @@
+"""
+Бенчмарки YaNews.
+
+Запускаются из директории ya_news как модули, например:
+python -m benchmarks.profanity
+"""
+import os
+import tempfile
+from pathlib import Path
+
+
+def setup_django(database=None, **overrides):
+    """
+    Настраиваем Django на отдельную базу для замеров.
+
+    Если путь не передан, база создаётся во временной директории, чтобы
+    синтетические данные не попадали в рабочую db.sqlite3. overrides
+    заменяют настройки до django.setup(), то есть до AppConfig.ready().
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    if database is None:
+        database = Path(tempfile.mkdtemp()) / 'benchmark.sqlite3'
+    for database_settings in settings.DATABASES.values():
+        database_settings['NAME'] = database
+    # Файловый кэш — рядом с базой замера: фрагменты прошлых запусков
+    # построены на других данных.
+    for alias, cache_settings in settings.CACHES.items():
+        cache_settings['LOCATION'] = Path(database).parent / 'cache' / alias
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    django.setup()
+    call_command('migrate', verbosity=0)
+    return database
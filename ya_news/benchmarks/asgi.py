@@ -0,0 +1,215 @@
+"""
+Медленные клиенты: синхронные страницы под WSGI против асинхронных под ASGI.
+
+Каждый клиент запрашивает ленту и страницу новости по очереди и читает
+ответ --delay миллисекунд. В режиме wsgi запрос целиком, вместе с
+медленной отдачей, занимает один из --threads потоков процесса, как в
+gunicorn с gthread. В режимах asgi-sync и asgi-async медленная отдача
+ждёт в цикле событий, а в asgi-async и сами страницы новостей
+(NEWS_ASYNC_VIEWS) уходят в поток только на время запросов к базе.
+
+ASGI-сервер здесь не нужен: приложения вызываются в том же процессе,
+каждый режим — в отдельном, чтобы настройки не смешивались.
+
+python -m benchmarks.asgi --clients 10 100 500 --delay 500
+"""
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+from . import setup_django
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def wsgi_call(app, path, delay):
+    """Запрос к WSGI-приложению, который держит поток до конца отдачи."""
+    environ = {'PATH_INFO': path, 'wsgi.input': io.BytesIO()}
+    setup_testing_defaults(environ)
+    environ['HTTP_HOST'] = 'testserver'
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    body = app(environ, start_response)
+    try:
+        for _ in body:
+            time.sleep(delay)
+    finally:
+        body.close()
+    return statuses[0]
+
+
+async def asgi_call(app, path, delay):
+    """Запрос к ASGI-приложению; медленный клиент ждёт в цикле событий."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Клиент не отключается: Django отменит ожидание сам.
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        else:
+            await asyncio.sleep(delay)
+
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+async def load(call, paths, clients, duration):
+    """Клиенты шлют запросы по кругу, пока не выйдет время."""
+    latencies, statuses = [], set()
+    deadline = time.perf_counter() + duration
+
+    async def client(number):
+        index = number
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            statuses.add(await call(paths[index % len(paths)]))
+            latencies.append((time.perf_counter() - started) * 1000)
+            index += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'status': sorted(statuses),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(quantiles[49], 1),
+        'p99_ms': round(quantiles[98], 1),
+    }
+
+
+def prepare(seed, comments):
+    from django.urls import reverse
+
+    from news.corpus import CorpusGenerator
+    from news.models import News
+
+    if not News.objects.exists():
+        CorpusGenerator(seed, batch_size=5000).generate(
+            users=max(comments // 100, 2), news=max(comments // 10, 1),
+            comments=comments
+        )
+    viral = News.objects.order_by('-comment_count', 'id').first()
+    return [reverse('news:home'), reverse('news:detail', args=(viral.id,))]
+
+
+def run_worker(args):
+    database = Path(args.data_dir) / f'asgi-{args.comments}-{args.seed}.db'
+    setup_django(database)
+    from django.conf import settings
+
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    # Маршруты читают настройку при импорте, то есть при первом reverse.
+    settings.NEWS_ASYNC_VIEWS = args.worker == 'asgi-async'
+    paths = prepare(args.seed, args.comments)
+    delay = args.delay / 1000
+
+    if args.worker == 'wsgi':
+        from django.core.handlers.wsgi import WSGIHandler
+
+        app = WSGIHandler()
+        pool = ThreadPoolExecutor(args.threads)
+
+        async def call(path):
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, wsgi_call, app, path, delay
+            )
+    else:
+        from django.core.handlers.asgi import ASGIHandler
+
+        app = ASGIHandler()
+
+        async def call(path):
+            return await asgi_call(app, path, delay)
+
+    results = [
+        dict(
+            asyncio.run(load(call, paths, clients, args.duration)),
+            mode=args.worker
+        )
+        for clients in args.clients
+    ]
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument(
+        '--clients', type=int, nargs='+', default=(10, 100, 500)
+    )
+    parser.add_argument(
+        '--delay', type=float, default=50, help='чтение ответа клиентом, мс'
+    )
+    parser.add_argument(
+        '--threads', type=int, default=8, help='потоков WSGI-процесса'
+    )
+    parser.add_argument(
+        '--duration', type=float, default=5,
+        help='секунд на каждое число клиентов'
+    )
+    parser.add_argument('--comments', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default='.benchmarks')
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        return run_worker(args)
+
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    print(f'{"режим":<12}{"клиентов":>10}{"запросов/с":>12}'
+          f'{"p50":>10}{"p99":>10}')
+    for mode in args.modes:
+        command = [
+            sys.executable, '-m', 'benchmarks.asgi', '--worker', mode,
+            '--clients', *map(str, args.clients),
+            '--delay', str(args.delay), '--threads', str(args.threads),
+            '--duration', str(args.duration),
+            '--comments', str(args.comments), '--seed', str(args.seed),
+            '--data-dir', args.data_dir,
+        ]
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+        for row in json.loads(output.splitlines()[-1]):
+            print(f'{row["mode"]:<12}{row["clients"]:>10}{row["rps"]:>12}'
+                  f'{row["p50_ms"]:>10}{row["p99_ms"]:>10}')
+
+
+if __name__ == '__main__':
+    main()
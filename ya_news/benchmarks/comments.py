@@ -0,0 +1,127 @@
+"""
+Поток комментариев к одной «горячей» новости: запись по одному против
+пакетной записи (COMMENT_BATCHING).
+
+--writers потоков отправляют форму комментария через тестовый клиент,
+пока не выйдет --duration секунд. Каждый режим идёт в отдельном процессе
+на своей файловой базе SQLite; в режиме batched после замера очередь
+дописывается, и число комментариев в базе сверяется с отправленными.
+
+python -m benchmarks.comments --writers 1 8 32
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from . import setup_django
+
+MODES = ('direct', 'batched')
+
+
+def post_comments(url, user, deadline, latencies, statuses):
+    from django.test import Client
+
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = client.post(url, {'text': 'Комментарий из замера'})
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses.append(response.status_code)
+
+
+def run_worker(args):
+    database = Path(tempfile.mkdtemp()) / 'comments.sqlite3'
+    setup_django(database, COMMENT_BATCHING=args.worker == 'batched')
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+
+    from news.batching import writer
+    from news.models import Comment, News
+
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    news = News.objects.create(title='Главная новость', text='Текст')
+    url = reverse('news:detail', args=(news.pk,))
+    results = []
+    for count in args.writers:
+        users = [
+            get_user_model().objects.create(username=f'writer-{count}-{i}')
+            for i in range(count)
+        ]
+        before = Comment.objects.count()
+        latencies, statuses = [], []
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(
+                target=post_comments,
+                args=(url, user, deadline, latencies, statuses)
+            )
+            for user in users
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        # Замер честный, только если очередь успевает за отправкой:
+        # дописываем остаток и сверяем базу.
+        if args.worker == 'batched':
+            writer.stop()
+            writer.start()
+        accepted = statuses.count(302)
+        quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        results.append({
+            'mode': args.worker,
+            'writers': count,
+            'accepted': accepted,
+            'errors': len(statuses) - accepted,
+            'stored': Comment.objects.count() - before,
+            'per_second': round(accepted / elapsed, 1),
+            'p50_ms': round(quantiles[49], 1),
+            'p99_ms': round(quantiles[98], 1),
+        })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument(
+        '--writers', type=int, nargs='+', default=(1, 8, 32)
+    )
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        return run_worker(args)
+
+    print(f'{"режим":<10}{"потоков":>9}{"в секунду":>11}{"p50":>9}'
+          f'{"p99":>9}{"ошибок":>8}{"в базе":>9}')
+    for mode in args.modes:
+        command = [
+            sys.executable, '-m', 'benchmarks.comments', '--worker', mode,
+            '--writers', *map(str, args.writers),
+            '--duration', str(args.duration),
+        ]
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+        for row in json.loads(output.splitlines()[-1]):
+            print(f'{row["mode"]:<10}{row["writers"]:>9}'
+                  f'{row["per_second"]:>11}{row["p50_ms"]:>9}'
+                  f'{row["p99_ms"]:>9}{row["errors"]:>8}'
+                  f'{row["stored"]:>9}/{row["accepted"]}')
+
+
+if __name__ == '__main__':
+    main()
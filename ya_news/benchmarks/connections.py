@@ -0,0 +1,144 @@
+"""
+Цена соединения с базой на запрос: без пула, CONN_MAX_AGE и пул.
+
+fresh — соединение открывается на каждый запрос (CONN_MAX_AGE = 0, как
+было раньше), persistent — живёт в своём потоке (CONN_MAX_AGE = None),
+pool — возвращается в пул процесса (OPTIONS['pool']). Для каждого режима
+меряется цикл «открыть соединение — закрыть» и задержка страницы
+комментариев, которая всегда читает базу; --threads потоков шлют запросы
+одновременно. Каждый режим — в отдельном процессе.
+
+python -m benchmarks.connections --threads 1 8
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from . import setup_django
+
+MODES = ('fresh', 'persistent', 'pool')
+
+
+def configure_connections(mode):
+    """Настройки читаются при каждом открытии соединения, меняем их."""
+    from django.db import connections
+
+    connections.close_all()
+    for alias in connections:
+        settings_dict = connections[alias].settings_dict
+        settings_dict['OPTIONS']['pool'] = mode == 'pool'
+        settings_dict['CONN_MAX_AGE'] = None if mode == 'persistent' else 0
+
+
+def connect_cycle_us(cycles):
+    from django.db import connection
+
+    connection.close()
+    started = time.perf_counter()
+    for _ in range(cycles):
+        connection.ensure_connection()
+        # Как в конце запроса: CONN_MAX_AGE решает, закрывать ли.
+        connection.close_if_unusable_or_obsolete()
+    return round((time.perf_counter() - started) / cycles * 1_000_000, 1)
+
+
+def send_requests(url, count, latencies):
+    from django.db import close_old_connections, connections
+    from django.test import Client
+
+    client = Client()
+    for _ in range(count):
+        started = time.perf_counter()
+        client.get(url)
+        # Тестовый клиент не закрывает соединения по request_finished,
+        # а обработчик WSGI закрывает.
+        close_old_connections()
+        latencies.append((time.perf_counter() - started) * 1000)
+    connections.close_all()
+
+
+def run_worker(args):
+    database = Path(tempfile.mkdtemp()) / 'connections.sqlite3'
+    setup_django(database)
+    from django.conf import settings
+    from django.urls import reverse
+
+    from news.corpus import CorpusGenerator
+    from news.models import News
+
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    CorpusGenerator(args.seed, batch_size=5000).generate(
+        users=10, news=10, comments=1000
+    )
+    url = reverse('news:comments', args=(News.objects.first().pk,))
+    configure_connections(args.worker)
+    results = []
+    cycle_us = connect_cycle_us(args.cycles)
+    for threads in args.threads:
+        latencies = []
+        workers = [
+            threading.Thread(
+                target=send_requests, args=(url, args.requests, latencies)
+            )
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        results.append({
+            'mode': args.worker,
+            'threads': threads,
+            'cycle_us': cycle_us,
+            'per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(quantiles[49], 2),
+            'p99_ms': round(quantiles[98], 2),
+        })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--threads', type=int, nargs='+', default=(1, 8))
+    parser.add_argument(
+        '--requests', type=int, default=500, help='запросов на поток'
+    )
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        return run_worker(args)
+
+    print(f'{"режим":<12}{"потоков":>9}{"цикл, мкс":>11}{"в секунду":>11}'
+          f'{"p50":>8}{"p99":>8}')
+    for mode in args.modes:
+        command = [
+            sys.executable, '-m', 'benchmarks.connections',
+            '--worker', mode, '--threads', *map(str, args.threads),
+            '--requests', str(args.requests), '--cycles', str(args.cycles),
+            '--seed', str(args.seed),
+        ]
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+        for row in json.loads(output.splitlines()[-1]):
+            print(f'{row["mode"]:<12}{row["threads"]:>9}'
+                  f'{row["cycle_us"]:>11}{row["per_second"]:>11}'
+                  f'{row["p50_ms"]:>8}{row["p99_ms"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Время загрузки фикстуры командами loaddata и load_news.
+
+Фикстура из --news новостей и --comments комментариев генерируется
+детерминированно (--seed) в формате news/fixtures/news.json. Каждая
+команда загружает её в отдельном процессе в пустую базу. Поисковый
+индекс обе команды обновляют сами (loaddata — через сигналы), а счётчики
+комментариев после loaddata пересчитываются отдельно и входят в его время.
+
+python -m benchmarks.loader --news 10000 --comments 200000
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from io import StringIO
+from itertools import chain
+from pathlib import Path
+
+from . import setup_django
+
+MODES = ('loaddata', 'load_news')
+USERS = 100
+
+
+def write_json(path, objects):
+    """Пишем JSON-массив по одному объекту, не собирая его в памяти."""
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[\n')
+        for number, obj in enumerate(objects):
+            if number:
+                file.write(',\n')
+            file.write(json.dumps(obj, ensure_ascii=False))
+        file.write('\n]\n')
+
+
+def write_fixtures(directory, news, comments, seed):
+    """Пользователи — отдельным файлом: их обе команды грузят одинаково."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    write_json(directory / 'users.json', (
+        {'model': 'auth.user', 'pk': pk,
+         'fields': {'username': f'user{pk}', 'password': '!'}}
+        for pk in range(1, USERS + 1)
+    ))
+    news_objects = (
+        {'model': 'news.news', 'pk': pk, 'fields': {
+            'title': f'Новость {pk}',
+            'text': f'Текст новости {pk}',
+            'date': str(date(2024, 1, 1) + timedelta(days=pk % 365)),
+        }}
+        for pk in range(1, news + 1)
+    )
+    comment_objects = (
+        {'model': 'news.comment', 'pk': pk, 'fields': {
+            'news': rng.randint(1, news),
+            'author': rng.randint(1, USERS),
+            'text': f'Комментарий {pk}',
+            'created': (
+                start + timedelta(seconds=rng.randrange(10 ** 7))
+            ).isoformat(),
+        }}
+        for pk in range(1, comments + 1)
+    )
+    write_json(
+        directory / 'news.json', chain(news_objects, comment_objects)
+    )
+
+
+def run_worker(args):
+    setup_django(Path(tempfile.mkdtemp()) / 'loader.sqlite3')
+    from django.core.management import call_command
+
+    from news.models import Comment, News
+
+    directory = Path(args.fixtures)
+    call_command('loaddata', str(directory / 'users.json'), verbosity=0)
+    fixture = str(directory / 'news.json')
+    started = time.perf_counter()
+    if args.worker == 'loaddata':
+        call_command('loaddata', fixture, verbosity=0)
+        News.recount_comments()
+    else:
+        call_command(
+            'load_news', fixture, batch_size=args.batch_size,
+            stdout=StringIO(),
+        )
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'mode': args.worker,
+        'seconds': round(elapsed, 2),
+        'rows': News.objects.count() + Comment.objects.count(),
+        'peak_rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--news', type=int, default=10_000)
+    parser.add_argument('--comments', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--fixtures', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        return run_worker(args)
+
+    fixtures = Path(tempfile.mkdtemp())
+    write_fixtures(fixtures, args.news, args.comments, args.seed)
+    print(f'{"команда":<11}{"секунд":>9}{"строк":>10}{"RSS, МБ":>10}'
+          f'{"ускорение":>11}')
+    baseline = None
+    for mode in args.modes:
+        command = [
+            sys.executable, '-m', 'benchmarks.loader', '--worker', mode,
+            '--fixtures', str(fixtures), '--batch-size', str(args.batch_size),
+        ]
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+        row = json.loads(output.splitlines()[-1])
+        baseline = baseline or row['seconds']
+        speedup = baseline / row['seconds'] if row['seconds'] else 0
+        print(f'{row["mode"]:<11}{row["seconds"]:>9}{row["rows"]:>10}'
+              f'{row["peak_rss_mb"]:>10}{speedup:>10.1f}×')
+
+
+if __name__ == '__main__':
+    main()
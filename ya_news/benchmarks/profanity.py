@@ -0,0 +1,59 @@
+"""
+Стоимость проверки комментария в зависимости от размера словаря.
+
+Сравниваем автомат Ахо — Корасик с прежним перебором слов.
+"""
+import argparse
+import random
+import timeit
+
+from news.profanity import WordMatcher, normalize
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def make_words(rng, count):
+    return [
+        ''.join(rng.choices(ALPHABET, k=rng.randint(5, 9)))
+        for _ in range(count)
+    ]
+
+
+def naive_search(words, text):
+    lowered_text = normalize(text)
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Обычный комментарий: около 500 символов без запрещённых слов.
+    text = ' '.join(make_words(rng, 70))
+    print(f'{"слов":>8} {"сборка, с":>10} {"автомат, мкс":>13} '
+          f'{"перебор, мкс":>13}')
+    for size in args.sizes:
+        words = make_words(rng, size)
+        started = timeit.default_timer()
+        matcher = WordMatcher(words)
+        build = timeit.default_timer() - started
+        automaton = timeit.timeit(
+            lambda: matcher.search(text), number=args.repeat
+        ) / args.repeat
+        naive = timeit.timeit(
+            lambda: naive_search(words, text), number=args.repeat
+        ) / args.repeat
+        print(f'{size:>8} {build:>10.2f} {automaton * 1e6:>13.1f} '
+              f'{naive * 1e6:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Задержка, число SQL-запросов и память для каждой страницы YaNews.
+
+Данные — синтетический корпус (news.corpus) на 10, 10 000 и миллион
+комментариев; базы с корпусами сохраняются в --data-dir и переиспользуются.
+По счётчику news_fragment_cache_requests_total печатается доля попаданий
+в кэш фрагментов; на тёплом кэше она должна быть не ниже --min-hit-ratio.
+Сравнение с прошлым прогоном:
+
+python -m benchmarks.routes --output new.json --compare old.json
+"""
+from .harness import Scenario, main
+
+NAMESPACES = ('news', 'users')
+
+
+def fragment_stats():
+    """Попадания и промахи кэша фрагментов с начала процесса."""
+    from news.metrics import FRAGMENT_CACHE
+    from yanews.metrics import snapshot
+
+    totals = {'hit': 0, 'miss': 0}
+    for (_, result), value in snapshot().get(FRAGMENT_CACHE.name, ()):
+        totals[result] += value
+    return totals['hit'], totals['miss']
+
+
+def prepare(size, seed):
+    """Корпус на size комментариев и сценарии для всех маршрутов."""
+    from django.urls import reverse
+
+    from news.corpus import CorpusGenerator
+    from news.models import Comment, News
+
+    if not News.objects.exists():
+        CorpusGenerator(seed, batch_size=5000).generate(
+            users=max(size // 100, 2), news=max(size // 10, 1), comments=size
+        )
+    viral = News.objects.order_by('-comment_count', 'id').first()
+    tail = News.objects.order_by('comment_count', 'id').first()
+    comment = Comment.objects.filter(news=viral).select_related(
+        'author'
+    ).order_by('id').first()
+    author = comment.author
+    word = viral.title.split()[0]
+    return [
+        Scenario('news:home', 'news:home', reverse('news:home')),
+        Scenario(
+            'news:home', 'news:home (авторизован)', reverse('news:home'),
+            user=author
+        ),
+        Scenario(
+            'news:search', 'news:search', reverse('news:search'),
+            data={'q': word}
+        ),
+        Scenario(
+            'news:detail', 'news:detail (вирусная)',
+            reverse('news:detail', args=(viral.id,))
+        ),
+        Scenario(
+            'news:detail', 'news:detail (хвост)',
+            reverse('news:detail', args=(tail.id,))
+        ),
+        Scenario(
+            'news:comments', 'news:comments',
+            reverse('news:comments', args=(viral.id,))
+        ),
+        Scenario(
+            'news:edit', 'news:edit', reverse('news:edit', args=(comment.id,)),
+            user=author
+        ),
+        Scenario(
+            'news:delete', 'news:delete',
+            reverse('news:delete', args=(comment.id,)), user=author
+        ),
+        # Запись идёт последней: она сбрасывает кэш вирусной новости.
+        Scenario(
+            'news:detail', 'news:detail (комментарий)',
+            reverse('news:detail', args=(viral.id,)), method='post',
+            data={'text': 'Комментарий из замера'}, user=author
+        ),
+        Scenario('users:login', 'users:login', reverse('users:login')),
+        Scenario('users:signup', 'users:signup', reverse('users:signup')),
+        Scenario(
+            'users:logout', 'users:logout (аноним)', reverse('users:logout'),
+            method='post'
+        ),
+    ]
+
+
+if __name__ == '__main__':
+    main('benchmarks.routes', __doc__, prepare, NAMESPACES, fragment_stats)
@@ -0,0 +1,88 @@
+"""
+Время построения поискового индекса и задержка поисковых запросов.
+
+По умолчанию строит синтетический корпус из миллиона комментариев.
+"""
+import argparse
+import random
+import statistics
+import timeit
+
+from . import setup_django
+
+WORDS = (
+    'новость', 'погода', 'выборы', 'футбол', 'курс', 'рубль', 'дождь',
+    'снег', 'концерт', 'театр', 'премьера', 'урожай', 'пробки', 'метро',
+    'школа', 'экзамен', 'робот', 'космос', 'ракета', 'лето', 'зима',
+)
+BATCH_SIZE = 10_000
+
+
+def make_text(rng, length):
+    return ' '.join(rng.choices(WORDS, k=length))
+
+
+def fill_corpus(rng, news_count, comment_count):
+    from django.contrib.auth import get_user_model
+    from news.models import Comment, News
+
+    author = get_user_model().objects.create(username='benchmark')
+    News.objects.bulk_create(
+        (
+            News(title=make_text(rng, 4), text=make_text(rng, 60))
+            for _ in range(news_count)
+        ),
+        batch_size=BATCH_SIZE
+    )
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                news_id=rng.choice(news_ids),
+                author=author,
+                text=make_text(rng, rng.randint(5, 40))
+            )
+            for _ in range(comment_count)
+        ),
+        batch_size=BATCH_SIZE
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', help='путь к базе для замеров')
+    parser.add_argument('--news', type=int, default=10_000)
+    parser.add_argument('--comments', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from news.search import SearchResults, rebuild_index
+
+    rng = random.Random(args.seed)
+    started = timeit.default_timer()
+    fill_corpus(rng, args.news, args.comments)
+    print(f'корпус: {timeit.default_timer() - started:.1f} с')
+
+    started = timeit.default_timer()
+    indexed = rebuild_index(args.chunk_size)
+    print(f'индекс: {indexed} записей за '
+          f'{timeit.default_timer() - started:.1f} с')
+
+    latencies = []
+    for _ in range(args.queries):
+        query = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        started = timeit.default_timer()
+        results = SearchResults(query)
+        results.count()
+        results[0:20]
+        latencies.append((timeit.default_timer() - started) * 1000)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f'запрос: p50 {quantiles[49]:.1f} мс, p95 {quantiles[94]:.1f} мс, '
+          f'p99 {quantiles[98]:.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Чтения и записи в секунду при параллельной работе с SQLite.
+
+Сравниваются стандартный бэкенд Django без настроек (plain) и yanews.db
+с PRAGMA из settings (tuned), где читатели ходят в соединение-реплику.
+--readers потоков читают первую страницу комментариев случайной новости,
+--writers потоков добавляют комментарии транзакциями, как форма. Каждый
+режим — в отдельном процессе со своей копией корпуса.
+
+python -m benchmarks.sqlite --readers 8 --writers 4
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from . import setup_django
+
+MODES = ('plain', 'tuned')
+
+
+def plain_databases(database):
+    return {
+        alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': database}
+        for alias in ('default', 'replica')
+    }
+
+
+def worker_loop(operation, deadline, seed, counts):
+    from django.db import OperationalError, connections
+
+    rng = random.Random(seed)
+    done = errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                operation(rng)
+                done += 1
+            except OperationalError:
+                # «database is locked» после истечения ожидания.
+                errors += 1
+    finally:
+        connections.close_all()
+    counts.append((done, errors))
+
+
+def run_worker(args):
+    database = Path(tempfile.mkdtemp()) / 'sqlite.sqlite3'
+    overrides = {}
+    if args.worker == 'plain':
+        overrides['DATABASES'] = plain_databases(database)
+    setup_django(database, **overrides)
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from django.db.models import F
+
+    from news.corpus import CorpusGenerator
+    from news.models import Comment, News
+
+    CorpusGenerator(args.seed, batch_size=5000).generate(
+        users=100, news=args.news, comments=args.comments
+    )
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    author = get_user_model().objects.first()
+
+    def read(rng):
+        list(
+            Comment.objects.using('replica')
+            .filter(news_id=rng.choice(news_ids))
+            .select_related('author')
+            .order_by('created', 'pk')[:50]
+        )
+
+    def write(rng):
+        news_id = rng.choice(news_ids)
+        with transaction.atomic():
+            Comment.objects.create(
+                news_id=news_id, author=author, text='Комментарий из замера'
+            )
+            News.objects.filter(pk=news_id).update(
+                comment_count=F('comment_count') + 1
+            )
+
+    reads, writes = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(
+            target=worker_loop, args=(read, deadline, number, reads)
+        )
+        for number in range(args.readers)
+    ] + [
+        threading.Thread(
+            target=worker_loop, args=(write, deadline, -number, writes)
+        )
+        for number in range(1, args.writers + 1)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'mode': args.worker,
+        'reads_per_second': round(sum(n for n, _ in reads) / elapsed, 1),
+        'writes_per_second': round(sum(n for n, _ in writes) / elapsed, 1),
+        'read_errors': sum(errors for _, errors in reads),
+        'write_errors': sum(errors for _, errors in writes),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=50_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        return run_worker(args)
+
+    print(f'{"режим":<8}{"чтений/с":>10}{"записей/с":>11}'
+          f'{"ошибок чтения":>15}{"ошибок записи":>15}')
+    for mode in args.modes:
+        command = [
+            sys.executable, '-m', 'benchmarks.sqlite', '--worker', mode,
+            '--readers', str(args.readers), '--writers', str(args.writers),
+            '--duration', str(args.duration), '--news', str(args.news),
+            '--comments', str(args.comments), '--seed', str(args.seed),
+        ]
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+        row = json.loads(output.splitlines()[-1])
+        print(f'{row["mode"]:<8}{row["reads_per_second"]:>10}'
+              f'{row["writes_per_second"]:>11}{row["read_errors"]:>15}'
+              f'{row["write_errors"]:>15}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Словарь запрещённых слов с горячей перезагрузкой.
+
+Слова собираются из встроенного списка, модели BannedWord и (если задан
+BANNED_WORDS_FILE) текстового файла, по слову в строке. Скомпилированный
+автомат хранится в памяти процесса вместе с отметкой версии: числом слов
+в базе, временем последней правки слова и временем изменения файла.
+Отметка проверяется при каждой проверке комментария, автомат
+пересобирается только когда она изменилась. Отметка читается из базы и
+файла, поэтому правки в админке видят все воркеры, какой бы ни был кэш.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import BannedWord
+from .profanity import WordMatcher
+
+BAD_WORDS = (
+    'редиска',
+    'негодяй',
+    # Дополните список на своё усмотрение.
+)
+
+_rebuild_lock = threading.Lock()
+# Пара (отметка версии, автомат) заменяется целиком одним присваиванием,
+# поэтому читатели никогда не увидят отметку от одного словаря,
+# а автомат — от другого.
+_compiled = (None, None)
+
+
+def get_file_mtime():
+    if not settings.BANNED_WORDS_FILE:
+        return None
+    try:
+        return os.stat(settings.BANNED_WORDS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def get_stamp():
+    # Удаление меняет число слов, добавление и правка — время правки.
+    words = BannedWord.objects.aggregate(
+        count=Count('id'), changed=Max('changed')
+    )
+    return words['count'], words['changed'], get_file_mtime()
+
+
+def load_words():
+    words = list(BAD_WORDS)
+    words.extend(BannedWord.objects.values_list('word', flat=True))
+    if get_file_mtime() is not None:
+        with open(settings.BANNED_WORDS_FILE, encoding='utf-8') as file:
+            words.extend(
+                line.strip() for line in file
+                if line.strip() and not line.startswith('#')
+            )
+    return words
+
+
+def get_matcher():
+    """
+    Актуальный автомат для проверки комментариев.
+
+    Пока один поток пересобирает словарь, остальные продолжают проверять
+    комментарии прежним автоматом и не ждут окончания сборки.
+    """
+    global _compiled
+    stamp = get_stamp()
+    compiled_stamp, matcher = _compiled
+    if stamp == compiled_stamp:
+        return matcher
+    if not _rebuild_lock.acquire(blocking=matcher is None):
+        return matcher
+    try:
+        if _compiled[0] != stamp:
+            _compiled = (stamp, WordMatcher(load_words()))
+        return _compiled[1]
+    finally:
+        _rebuild_lock.release()
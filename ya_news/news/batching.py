@@ -0,0 +1,222 @@
+"""
+Пакетная запись комментариев.
+
+При COMMENT_BATCHING форма комментария не пишет в базу сама, а кладёт
+проверенный комментарий в очередь процесса. Фоновый поток забирает
+очередь пачками — по COMMENT_BATCH_SIZE штук или раз в
+COMMENT_BATCH_INTERVAL секунд — и сохраняет каждую пачку одной
+транзакцией: на SQLite это одна блокировка базы вместо сотни.
+
+Пока комментарий ждёт записи, автор видит его на странице новости через
+pending_comments; остальные читатели увидят его после записи пачки.
+Очередь живёт в памяти процесса: комментарии, не записанные к моменту
+аварийной остановки, теряются. При обычном завершении очередь
+дописывается.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import HOME_FRAGMENT, bump_version, detail_fragment
+from .metrics import COMMENT_BATCHES
+from .models import Comment, News
+from .search import index_comments
+
+logger = logging.getLogger(__name__)
+
+STOP = object()
+
+
+class CommentWriter:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, comment):
+        """Ставим несохранённый комментарий в очередь на запись."""
+        # Время пока нужно только для показа автору; в базе будет время
+        # записи пачки.
+        comment.created = timezone.now()
+        with self.lock:
+            self.pending.setdefault(
+                (comment.news_id, comment.author_id), []
+            ).append(comment)
+        self.queue.put(comment)
+
+    def pending_for(self, news_id, author_id):
+        with self.lock:
+            return list(self.pending.get((news_id, author_id), ()))
+
+    def take(self, limit, timeout=None):
+        """
+        Пачка из очереди: ждём первый комментарий не дольше timeout, затем
+        добираем до limit, пока не выйдет COMMENT_BATCH_INTERVAL.
+        """
+        try:
+            first = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + settings.COMMENT_BATCH_INTERVAL
+        while first is not STOP and len(batch) < limit:
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self.queue.get(timeout=remaining) if remaining > 0
+                    else self.queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is STOP:
+                break
+        return batch
+
+    def save(self, comments):
+        """
+        Сохраняем комментарии одной транзакцией, возвращаем сохранённые.
+
+        Комментарии к новостям, удалённым после отправки формы,
+        отбрасываются: иначе проверка внешнего ключа при коммите
+        откатила бы всю пачку.
+        """
+        with transaction.atomic():
+            existing = set(News.objects.filter(
+                pk__in={comment.news_id for comment in comments}
+            ).values_list('pk', flat=True))
+            comments = [
+                comment for comment in comments if comment.news_id in existing
+            ]
+            Comment.objects.bulk_create(comments)
+            counts = Counter(comment.news_id for comment in comments)
+            for news_id, count in counts.items():
+                News.objects.filter(pk=news_id).update(
+                    comment_count=F('comment_count') + count
+                )
+        return comments
+
+    def write(self, comments):
+        """Пишем пачку, возвращаем число сохранённых комментариев."""
+        try:
+            written = self.save(comments)
+        except IntegrityError:
+            # Например, удалили автора. Пишем по одному, чтобы потерять
+            # только плохие строки, а не чужие комментарии из пачки.
+            written = []
+            for comment in comments:
+                comment.pk = None
+                comment._state.adding = True
+                try:
+                    written.extend(self.save([comment]))
+                except IntegrityError:
+                    pass
+        if len(written) < len(comments):
+            logger.warning(
+                'Не записано %s комментариев: новость или автор удалены',
+                len(comments) - len(written)
+            )
+        if not written:
+            return 0
+        # bulk_create не отправляет сигналы, поэтому делаем то же, что
+        # comment_saved, но один раз на пачку.
+        index_comments(written)
+        bump_version(HOME_FRAGMENT)
+        for news_id in {comment.news_id for comment in written}:
+            bump_version(detail_fragment(news_id))
+        COMMENT_BATCHES.observe(len(written))
+        return len(written)
+
+    def write_batch(self, batch):
+        comments = [item for item in batch if item is not STOP]
+        if not comments:
+            return 0
+        try:
+            return self.write(comments)
+        except Exception:
+            logger.exception(
+                'Не удалось записать %s комментариев', len(comments)
+            )
+            return 0
+        finally:
+            self.forget(comments)
+
+    def forget(self, comments):
+        with self.lock:
+            for comment in comments:
+                key = (comment.news_id, comment.author_id)
+                waiting = self.pending.get(key, [])
+                if comment in waiting:
+                    waiting.remove(comment)
+                if not waiting:
+                    self.pending.pop(key, None)
+
+    def flush(self):
+        """
+        Записываем всё, что уже в очереди, в текущем потоке.
+
+        Для тестов и команд, где фоновый поток не запущен; возвращаем
+        число записанных комментариев.
+        """
+        written = 0
+        while True:
+            batch = []
+            try:
+                while len(batch) < settings.COMMENT_BATCH_SIZE:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return written
+            written += self.write_batch(batch)
+
+    def run(self):
+        while True:
+            batch = self.take(settings.COMMENT_BATCH_SIZE)
+            self.write_batch(batch)
+            close_old_connections()
+            if STOP in batch:
+                return
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(
+                target=self.run, name='comment-writer', daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        """Дописываем очередь и останавливаем поток."""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join()
+        self.thread = None
+
+    def after_fork(self):
+        """Потоки не переживают fork: дочерний процесс заводит свой."""
+        running = self.thread is not None
+        self.__init__()
+        if running:
+            self.start()
+
+
+writer = CommentWriter()
+os.register_at_fork(after_in_child=writer.after_fork)
+atexit.register(writer.stop)
+
+
+def pending_comments(news_id, user):
+    """Комментарии пользователя к новости, ещё не записанные в базу."""
+    if not user.is_authenticated:
+        return []
+    return writer.pending_for(news_id, user.pk)
@@ -0,0 +1,111 @@
+"""
+Версионированный кэш отрендеренных фрагментов страниц.
+
+Каждый фрагмент хранится под ключом, в который входит номер версии.
+Изменение данных увеличивает версию, поэтому старые фрагменты просто
+перестают запрашиваться и вытесняются бэкендом кэша сами. Фрагменты
+лежат в псевдониме FRAGMENT_CACHE_ALIAS, отдельно от сессий.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+from .metrics import FRAGMENT_CACHE
+
+HOME_FRAGMENT = 'news:home'
+
+
+def detail_fragment(news_id):
+    return f'news:detail:{news_id}'
+
+
+def fragment_cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def version_key(name):
+    return f'{name}:version'
+
+
+def get_version(name):
+    """Текущая версия фрагмента; при первом обращении заводим новую."""
+    cache = fragment_cache()
+    key = version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # Начинаем со времени, а не с единицы: если ключ версии вытеснят
+        # из кэша, новая версия не совпадёт со старыми фрагментами.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Сбрасываем все фрагменты, построенные на прежней версии."""
+    # Не incr: в файловом кэше он не атомарен, и два воркера, меняющие
+    # данные одновременно, получили бы одну и ту же новую версию.
+    fragment_cache().set(version_key(name), time.time_ns(), None)
+
+
+def bump_on_commit(*names):
+    """
+    Меняем версии после коммита текущей транзакции.
+
+    Иначе читатель с другим соединением успеет построить фрагмент без
+    изменения уже под новой версией, и тот проживёт до следующей правки.
+    """
+    def bump():
+        for name in names:
+            bump_version(name)
+
+    transaction.on_commit(bump)
+
+
+def fragment_kind(name):
+    """Вид фрагмента без id новости — метка для метрик."""
+    return ':'.join(name.split(':')[:2])
+
+
+def get_fragment(name, build):
+    """
+    Возвращаем фрагмент для текущей версии.
+
+    Функция build вызывается только при промахе кэша.
+    """
+    cache = fragment_cache()
+    key = f'{name}:{get_version(name)}'
+    html = cache.get(key)
+    if html is None:
+        FRAGMENT_CACHE.inc(fragment_kind(name), 'miss')
+        html = build()
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    else:
+        FRAGMENT_CACHE.inc(fragment_kind(name), 'hit')
+    return mark_safe(html)
+
+
+async def aget_version(name):
+    cache = fragment_cache()
+    key = version_key(name)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def aget_fragment(name, build):
+    """Асинхронный get_fragment: build — корутина без аргументов."""
+    cache = fragment_cache()
+    key = f'{name}:{await aget_version(name)}'
+    html = await cache.aget(key)
+    if html is None:
+        FRAGMENT_CACHE.inc(fragment_kind(name), 'miss')
+        html = await build()
+        await cache.aset(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    else:
+        FRAGMENT_CACHE.inc(fragment_kind(name), 'hit')
+    return mark_safe(html)
@@ -0,0 +1,129 @@
+"""
+Детерминированный синтетический корпус для нагрузочных замеров.
+
+Одинаковые параметры и seed дают одни и те же пользователи, новости и
+комментарии. Комментарии распределены по новостям по закону Ципфа:
+несколько «вирусных» новостей собирают большую часть обсуждения,
+у остальных — длинный хвост из единиц комментариев.
+"""
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .cache import HOME_FRAGMENT, bump_version
+from .models import Comment, News
+from .search import rebuild_index
+
+# Даты отсчитываются от фиксированного дня, а не от сегодняшнего,
+# чтобы корпус не зависел от дня генерации.
+START_DATE = date(2024, 1, 1)
+SYLLABLES = (
+    'ба', 'ве', 'ги', 'до', 'ку', 'ла', 'ми', 'но', 'пе', 'ро', 'са', 'ти',
+    'фу', 'ха', 'це', 'ча', 'шо', 'ще', 'ют', 'яр', 'ан', 'ек', 'ил', 'ос',
+)
+VOCABULARY_SIZE = 5000
+
+
+def build_vocabulary(rng, size=VOCABULARY_SIZE):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(1, 4))))
+    return sorted(words)
+
+
+def sentence(rng, vocabulary, low, high):
+    return ' '.join(rng.choices(vocabulary, k=rng.randint(low, high)))
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса для random.choices: вес ранга r — 1 / r ** skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class CorpusGenerator:
+    def __init__(self, seed, batch_size, prefix='corpus', skew=1.1,
+                 password='corpus-password'):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.skew = skew
+        self.password = password
+        self.vocabulary = build_vocabulary(self.rng)
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def create_users(self, count):
+        User = get_user_model()
+        # Хэш считается один раз: PBKDF2 на миллион пользователей —
+        # это часы, а не минуты.
+        password = make_password(self.password)
+        ids = []
+        for batch in self.batches(count):
+            users = User.objects.bulk_create(
+                User(username=f'{self.prefix}{number:07d}', password=password)
+                for number in batch
+            )
+            ids.extend(user.pk for user in users)
+        return ids
+
+    def create_news(self, count, days):
+        title_length = News._meta.get_field('title').max_length
+        ids = []
+        for batch in self.batches(count):
+            with transaction.atomic():
+                news = News.objects.bulk_create(
+                    News(
+                        title=sentence(
+                            self.rng, self.vocabulary, 2, 8
+                        )[:title_length],
+                        text=sentence(self.rng, self.vocabulary, 20, 200),
+                        date=START_DATE - timedelta(
+                            days=self.rng.randrange(days)
+                        ),
+                    )
+                    for _ in batch
+                )
+            ids.extend(item.pk for item in news)
+        return ids
+
+    def create_comments(self, count, news_ids, user_ids):
+        """Комментарии к новостям, где номер в рейтинге Ципфа случаен."""
+        ranked = list(news_ids)
+        self.rng.shuffle(ranked)
+        weights = zipf_weights(len(ranked), self.skew)
+        start = datetime.combine(START_DATE, time(), timezone.utc)
+        for batch in self.batches(count):
+            targets = self.rng.choices(ranked, cum_weights=weights,
+                                       k=len(batch))
+            comments = [
+                Comment(
+                    news_id=news_id,
+                    author_id=self.rng.choice(user_ids),
+                    text=sentence(self.rng, self.vocabulary, 3, 60),
+                )
+                for news_id in targets
+            ]
+            with transaction.atomic():
+                Comment.objects.bulk_create(comments)
+                # auto_now_add перезаписывает время при вставке, поэтому
+                # время из корпуса ставим отдельным запросом на пачку.
+                for number, comment in zip(batch, comments):
+                    comment.created = start + timedelta(seconds=number)
+                Comment.objects.bulk_update(comments, ('created',))
+
+    def generate(self, users, news, comments, days=365):
+        user_ids = self.create_users(users)
+        news_ids = self.create_news(news, days)
+        if comments:
+            self.create_comments(comments, news_ids, user_ids)
+        # bulk_create не отправляет сигналы, поэтому производные данные
+        # обновляем сами, один раз на весь корпус.
+        News.recount_comments()
+        rebuild_index(self.batch_size)
+        bump_version(HOME_FRAGMENT)
@@ -1,13 +1,10 @@
 from django.core.exceptions import ValidationError
 from django.forms import ModelForm
 
+from .banned_words import BAD_WORDS, get_matcher  # noqa: F401
+from .metrics import PROFANITY_REJECTIONS
 from .models import Comment
 
-BAD_WORDS = (
-    'редиска',
-    'негодяй',
-    # Дополните список на своё усмотрение.
-)
 WARNING = 'Не ругайтесь!'
 
 
@@ -20,8 +17,7 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if get_matcher().search(text):
+            PROFANITY_REJECTIONS.inc()
+            raise ValidationError(WARNING)
         return text
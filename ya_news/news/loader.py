@@ -0,0 +1,229 @@
+"""
+Потоковая загрузка новостей и комментариев из фикстур.
+
+Понимает формат fixtures/news.json (JSON-массив объектов) и NDJSON
+с теми же объектами. Файл читается кусками и разбирается по одному
+объекту, строки пишутся пачками через bulk_create, так что расход памяти
+не зависит от размера файла.
+
+Каждая пачка коммитится сразу, поэтому, в отличие от loaddata, проверку
+внешних ключей нельзя отложить до конца файла: новость должна идти в
+файле раньше своих комментариев или уже быть в базе. При ошибке в данных
+пачки, записанные до неё, остаются в базе, а FixtureError называет номер
+объекта в файле.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .cache import HOME_FRAGMENT, bump_version, detail_fragment
+from .models import Comment, News
+from .search import index_comments, index_news
+
+READ_SIZE = 1 << 16
+# Один объект фикстуры больше этого считаем ошибкой формата, а не
+# поводом читать файл в память до конца.
+MAX_OBJECT_SIZE = 1 << 24
+# Всё, что может стоять между объектами в массиве и в NDJSON.
+SEPARATORS = frozenset(' \t\r\n,[]')
+DECODER = json.JSONDecoder()
+# Ошибки записи пачки, вызванные данными фикстуры, а не базой.
+DATA_ERRORS = (ValidationError, IntegrityError, TypeError, ValueError)
+
+
+class FixtureError(ValueError):
+    """Файл не похож на фикстуру новостей."""
+
+
+def iter_objects(file):
+    """Объекты фикстуры по одному, без чтения файла целиком."""
+    buffer, position = '', 0
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if position == len(buffer):
+            buffer, position = file.read(READ_SIZE), 0
+            if not buffer:
+                return
+            continue
+        try:
+            obj, position = DECODER.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            chunk = file.read(READ_SIZE)
+            if not chunk or len(buffer) - position > MAX_OBJECT_SIZE:
+                raise FixtureError(f'Некорректный JSON: {error}')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield obj
+
+
+class FixtureLoader:
+    """
+    Копит объекты и записывает их пачками.
+
+    Перед записью комментариев записываются накопленные новости, чтобы
+    комментарии могли ссылаться на новости из того же файла по pk.
+    bulk_create не отправляет сигналы, поэтому поисковый индекс, кэш
+    страниц и счётчики комментариев обновляются здесь же.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.news = []
+        self.comments = []
+        self.authors = []
+        # Номера объектов в файле, для сообщений об ошибках.
+        self.position = 0
+        self.news_positions = []
+        self.comment_positions = []
+        self.loaded = 0
+
+    def add(self, obj):
+        self.position += 1
+        if not isinstance(obj, dict):
+            raise FixtureError(
+                f'Объект {self.position}: ожидался объект фикстуры.'
+            )
+        model = str(obj.get('model', '')).lower()
+        try:
+            fields = dict(obj.get('fields', {}))
+            if model == 'news.news':
+                news = News(pk=obj.get('pk'), **fields)
+            elif model == 'news.comment':
+                author = fields.pop('author')
+                comment = Comment(
+                    pk=obj.get('pk'), news_id=fields.pop('news'), **fields
+                )
+            else:
+                raise FixtureError(f'неизвестная модель {model}.')
+        except (FixtureError, TypeError, ValueError, KeyError) as error:
+            raise FixtureError(f'Объект {self.position}: {error}') from error
+        if model == 'news.news':
+            self.news.append(news)
+            self.news_positions.append(self.position)
+            if len(self.news) >= self.batch_size:
+                self.flush_news()
+        else:
+            self.authors.append(author)
+            self.comments.append(comment)
+            self.comment_positions.append(self.position)
+            if len(self.comments) >= self.batch_size:
+                self.flush_comments()
+
+    @staticmethod
+    def locate(objects, positions):
+        """Первый объект пачки с некорректным значением поля."""
+        for obj, position in zip(objects, positions):
+            for field in obj._meta.concrete_fields:
+                try:
+                    field.to_python(getattr(obj, field.attname))
+                except (ValidationError, TypeError, ValueError):
+                    return f'Объект {position}'
+        return f'Объекты {positions[0]}–{positions[-1]}'
+
+    def write(self, objects, positions, save):
+        """Записываем пачку; ошибку данных сводим к номеру объекта."""
+        try:
+            save()
+        except FixtureError:
+            raise
+        except DATA_ERRORS as error:
+            raise FixtureError(
+                f'{self.locate(objects, positions)}: {error}'
+            ) from error
+
+    def flush_news(self):
+        if not self.news:
+            return
+
+        def save():
+            with transaction.atomic():
+                News.objects.bulk_create(self.news)
+                index_news(self.news)
+
+        self.write(self.news, self.news_positions, save)
+        self.loaded += len(self.news)
+        self.news = []
+        self.news_positions = []
+
+    def resolve_authors(self):
+        """Автор задаётся pk или натуральным ключом ['username']."""
+        usernames = {
+            author[0] for author in self.authors if isinstance(author, list)
+        }
+        user_ids = dict(
+            get_user_model().objects.filter(
+                username__in=usernames
+            ).values_list('username', 'pk')
+        )
+        for comment, author, position in zip(
+            self.comments, self.authors, self.comment_positions
+        ):
+            if isinstance(author, list):
+                try:
+                    author = user_ids[author[0]]
+                except KeyError:
+                    raise FixtureError(
+                        f'Объект {position}: нет пользователя {author[0]}.'
+                    )
+            comment.author_id = author
+
+    def check_news(self, news_ids):
+        existing = {
+            str(pk) for pk in
+            News.objects.filter(pk__in=news_ids).values_list('pk', flat=True)
+        }
+        for comment, position in zip(self.comments, self.comment_positions):
+            if str(comment.news_id) not in existing:
+                raise FixtureError(
+                    f'Объект {position}: нет новости {comment.news_id}; '
+                    'новость должна идти в файле раньше комментариев.'
+                )
+
+    def flush_comments(self):
+        if not self.comments:
+            return
+        self.flush_news()
+        self.resolve_authors()
+        news_ids = {comment.news_id for comment in self.comments}
+        self.check_news(news_ids)
+        # auto_now_add перезапишет время при вставке, восстанавливаем его
+        # из фикстуры отдельным запросом на всю пачку.
+        created = [comment.created for comment in self.comments]
+
+        def save():
+            with transaction.atomic():
+                Comment.objects.bulk_create(self.comments)
+                restored = []
+                for comment, value in zip(self.comments, created):
+                    if value is not None:
+                        comment.created = value
+                        restored.append(comment)
+                Comment.objects.bulk_update(restored, ('created',))
+                index_comments(self.comments)
+                # Пересчитываем только новости этой пачки, а не всю таблицу.
+                News.recount_comments(News.objects.filter(pk__in=news_ids))
+
+        self.write(self.comments, self.comment_positions, save)
+        for news_id in news_ids:
+            bump_version(detail_fragment(news_id))
+        self.loaded += len(self.comments)
+        self.comments = []
+        self.authors = []
+        self.comment_positions = []
+
+    def finish(self):
+        self.flush_comments()
+        self.flush_news()
+        bump_version(HOME_FRAGMENT)
+        return self.loaded
+
+
+def load_fixture(file, batch_size):
+    """Загружаем фикстуру из файла, возвращаем число записанных строк."""
+    loader = FixtureLoader(batch_size)
+    for obj in iter_objects(file):
+        loader.add(obj)
+    return loader.finish()
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news.corpus import CorpusGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу детерминированным синтетическим корпусом '
+        'пользователей, новостей и комментариев для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--news', type=int, default=100_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель закона Ципфа для числа комментариев.'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='corpus',
+            help='Начало имён синтетических пользователей.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['comments'] and not (options['users'] and options['news']):
+            raise CommandError(
+                'Для комментариев нужны пользователи и новости.'
+            )
+        if options['days'] < 1:
+            raise CommandError('--days должно быть положительным.')
+        CorpusGenerator(
+            options['seed'],
+            options['batch_size'],
+            prefix=options['prefix'],
+            skew=options['skew'],
+        ).generate(
+            options['users'],
+            options['news'],
+            options['comments'],
+            days=options['days'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: пользователей {users}, новостей {news}, '
+            'комментариев {comments}.'.format(**options)
+        ))
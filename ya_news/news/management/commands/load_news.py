@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.loader import FixtureError, load_fixture
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает новости и комментарии из фикстуры '
+        '(JSON-массив или NDJSON) пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='Файлы фикстур; «-» — читать из stdin.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        loaded = 0
+        for path in options['paths']:
+            try:
+                if path == '-':
+                    loaded += load_fixture(sys.stdin, options['batch_size'])
+                    continue
+                with open(path, encoding='utf-8') as file:
+                    loaded += load_fixture(file, options['batch_size'])
+            except (FixtureError, TypeError, KeyError) as error:
+                raise CommandError(f'{path}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Загружено записей: {loaded}'))
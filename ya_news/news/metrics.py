@@ -0,0 +1,21 @@
+"""Метрики приложения новостей, см. yanews.metrics."""
+from yanews.metrics import Counter, Histogram
+
+COMMENTS_SUBMITTED = Counter(
+    'news_comments_submitted_total',
+    'Добавленные комментарии.'
+)
+PROFANITY_REJECTIONS = Counter(
+    'news_profanity_rejections_total',
+    'Комментарии, отклонённые из-за запрещённых слов.'
+)
+FRAGMENT_CACHE = Counter(
+    'news_fragment_cache_requests_total',
+    'Обращения к кэшу отрендеренных фрагментов.',
+    ('fragment', 'result')
+)
+COMMENT_BATCHES = Histogram(
+    'news_comment_batch_size',
+    'Комментарии в одной пачке фоновой записи.',
+    buckets=(1, 5, 10, 50, 100, 250, 500, 1000)
+)
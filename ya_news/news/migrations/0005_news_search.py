@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_bannedword'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE VIRTUAL TABLE news_search USING fts5(
+                title,
+                text,
+                news_id UNINDEXED,
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            'DROP TABLE IF EXISTS news_search',
+        ),
+        migrations.RunSQL(
+            [
+                """
+                INSERT INTO news_search(rowid, title, text, news_id)
+                SELECT id * 2, title, text, id FROM news_news
+                """,
+                """
+                INSERT INTO news_search(rowid, title, text, news_id)
+                SELECT id * 2 + 1, '', text, news_id FROM news_comment
+                """,
+            ],
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_news_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bannedword',
+            name='changed',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+    ]
@@ -2,21 +2,46 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('-date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def recount_comments(cls, queryset=None):
+        """
+        Пересчитываем счётчик комментариев по фактическим данным.
+
+        Возвращает количество обновлённых новостей.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        comments = Comment.objects.filter(
+            news=models.OuterRef('pk')
+        ).order_by().values('news').annotate(
+            total=models.Count('pk')
+        ).values('total')
+        return queryset.update(
+            comment_count=Coalesce(
+                models.Subquery(comments), 0
+            )
+        )
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -32,6 +57,27 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_thread_idx'
+            ),
+            models.Index(fields=('author', 'id'), name='comment_author_idx'),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+
+class BannedWord(models.Model):
+    word = models.CharField('Слово', max_length=100, unique=True)
+    # По нему воркеры замечают правку слова, см. banned_words.get_stamp.
+    changed = models.DateTimeField('Изменено', auto_now=True)
+
+    class Meta:
+        ordering = ('word',)
+        verbose_name_plural = 'Запрещённые слова'
+        verbose_name = 'Запрещённое слово'
+
+    def __str__(self):
+        return self.word
@@ -0,0 +1,25 @@
+"""
+Персональная «накладка» поверх общих закэшированных фрагментов.
+
+В общем фрагменте вместо ссылок редактирования стоят маркеры с id
+комментария и автора; здесь они заменяются ссылками для владельца
+комментария и убираются для всех остальных.
+"""
+import re
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CONTROLS_MARKER = re.compile(r'<!-- comment-controls:(\d+):(\d+) -->')
+
+
+def add_owner_controls(html, user):
+    def replace(match):
+        comment_id, author_id = map(int, match.groups())
+        if author_id != user.pk:
+            return ''
+        return render_to_string(
+            'news/includes/comment_controls.html',
+            {'comment_id': comment_id}
+        )
+    return mark_safe(CONTROLS_MARKER.sub(replace, html))
@@ -0,0 +1,69 @@
+"""Курсорная (keyset) пагинация ленты комментариев."""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+CURSOR_SEPARATOR = '|'
+
+
+def encode_cursor(comment):
+    """Курсор указывает на последний показанный комментарий."""
+    raw = f'{comment.created.isoformat()}{CURSOR_SEPARATOR}{comment.pk}'
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает пару (created, id) или сообщает о битом курсоре."""
+    try:
+        raw = urlsafe_b64decode(cursor.encode()).decode()
+        created, pk = raw.split(CURSOR_SEPARATOR)
+        return datetime.fromisoformat(created), int(pk)
+    except (BinasciiError, UnicodeError, ValueError):
+        raise BadRequest('Некорректный курсор.')
+
+
+def keyset_queryset(queryset, cursor, size):
+    """
+    Комментарии страницы, следующей за курсором, и ещё один сверху.
+
+    Сортировка по (created, id) стабильна даже при одинаковом времени
+    создания, а фильтр по ключу не зависит от того, насколько далеко
+    пролистана лента. Лишний комментарий показывает, есть ли следующая
+    страница.
+    """
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk)
+        )
+    return queryset.order_by('created', 'pk')[:size + 1]
+
+
+def split_page(items, size):
+    if len(items) <= size:
+        return items, None
+    items = items[:size]
+    return items, encode_cursor(items[-1])
+
+
+def keyset_page(queryset, cursor, size):
+    """
+    Отдаём страницу комментариев, следующих за курсором.
+
+    Возвращает список комментариев и курсор следующей страницы (None,
+    если страница последняя).
+    """
+    return split_page(list(keyset_queryset(queryset, cursor, size)), size)
+
+
+async def akeyset_page(queryset, cursor, size):
+    """Асинхронный keyset_page для представлений под ASGI."""
+    items = [
+        item async for item in keyset_queryset(
+            queryset, cursor, size
+        ).aiterator()
+    ]
+    return split_page(items, size)
@@ -0,0 +1,84 @@
+"""
+Поиск запрещённых слов в тексте за один проход.
+
+Словарь компилируется в автомат Ахо — Корасик, поэтому время проверки
+комментария зависит от длины текста, а не от размера словаря.
+"""
+from collections import deque
+
+# Латинские буквы, которые на глаз не отличить от кириллических.
+HOMOGLYPHS = str.maketrans({
+    'a': 'а',
+    'b': 'в',
+    'c': 'с',
+    'e': 'е',
+    'h': 'н',
+    'k': 'к',
+    'm': 'м',
+    'o': 'о',
+    'p': 'р',
+    't': 'т',
+    'x': 'х',
+    'y': 'у',
+    'ё': 'е',
+})
+
+
+def normalize(text):
+    """Приводим текст к нижнему регистру и кириллическим двойникам."""
+    return text.lower().translate(HOMOGLYPHS)
+
+
+class WordMatcher:
+    """Автомат Ахо — Корасик для набора запрещённых слов."""
+
+    def __init__(self, words):
+        # Состояние — индекс в списках; 0 — корень бора.
+        self._goto = [{}]
+        self._fail = [0]
+        self._match = [None]
+        for word in words:
+            self._add(word)
+        self._link()
+
+    def _add(self, word):
+        normalized = normalize(word)
+        if not normalized:
+            return
+        state = 0
+        for char in normalized:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._match.append(None)
+            state = next_state
+        self._match[state] = word
+
+    def _link(self):
+        """Строим суффиксные ссылки обходом бора в ширину."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._match[child] is None:
+                    self._match[child] = self._match[self._fail[child]]
+
+    def search(self, text):
+        """Первое найденное запрещённое слово или None."""
+        goto, fail, match = self._goto, self._fail, self._match
+        state = 0
+        for char in normalize(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if match[state] is not None:
+                return match[state]
+        return None
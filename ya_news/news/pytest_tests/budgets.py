@@ -0,0 +1,114 @@
+"""
+Бюджеты SQL-запросов и времени ответа для страниц YaNews.
+
+Бюджеты объявлены здесь, в одном месте, по имени маршрута. Проверка
+делается фикстурой request_budget из conftest: она выполняет запрос,
+считает SQL и время, а при превышении печатает отпечатки запросов —
+SQL без конкретных значений, с числом повторов. N+1 выглядит в отчёте
+как один отпечаток, повторённый много раз.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections, reset_queries
+from django.http import HttpRequest
+
+from users.auth import load_user
+
+
+class Budget(NamedTuple):
+    queries: int
+    milliseconds: float = 500
+
+
+# Худший случай для маршрута — пустой кэш фрагментов. Сессия и
+# пользователь берутся из кэша (см. warm_auth) и запросов не добавляют.
+BUDGETS = {
+    'news:home': Budget(queries=1),
+    'news:detail': Budget(queries=2),
+    'news:comments': Budget(queries=1),
+    'news:search': Budget(queries=2),
+    'news:edit': Budget(queries=2),
+    'news:delete': Budget(queries=2),
+    'users:login': Budget(queries=0),
+    'users:signup': Budget(queries=0),
+}
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST = re.compile(r'\bIN \((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL без значений: запросы, отличающиеся только параметрами, равны."""
+    sql = NUMBER.sub('?', STRING.sub('?', sql))
+    return SPACES.sub(' ', IN_LIST.sub('IN (...)', sql)).strip()
+
+
+def report(name, budget, queries, milliseconds):
+    lines = [
+        f'{name}: {len(queries)} запросов (бюджет {budget.queries}), '
+        f'{milliseconds:.1f} мс (бюджет {budget.milliseconds} мс)'
+    ]
+    counts = Counter(fingerprint(query['sql']) for query in queries)
+    for sql, count in counts.most_common():
+        lines.append(f'  {count} × {sql}')
+    return '\n'.join(lines)
+
+
+@contextmanager
+def capture_queries():
+    """
+    Запросы ко всем псевдонимам базы, включая реплику.
+
+    Как CaptureQueriesContext, но сразу для всех соединений и без их
+    открытия: в тесте обращение к неразрешённому псевдониму — ошибка.
+    """
+    captured = []
+    started = [
+        (wrapper, wrapper.force_debug_cursor, len(wrapper.queries_log))
+        for wrapper in connections.all(initialized_only=False)
+    ]
+    for wrapper, _, _ in started:
+        wrapper.force_debug_cursor = True
+    # Иначе начало запроса очистит журналы соединений.
+    request_started.disconnect(reset_queries)
+    try:
+        yield captured
+    finally:
+        request_started.connect(reset_queries)
+        for wrapper, force_debug_cursor, start in started:
+            wrapper.force_debug_cursor = force_debug_cursor
+            captured.extend(list(wrapper.queries_log)[start:])
+
+
+def warm_auth(client):
+    """Сессия и пользователь клиента в кэше, как со второго запроса."""
+    if settings.SESSION_COOKIE_NAME not in client.cookies:
+        return
+    request = HttpRequest()
+    request.session = client.session
+    load_user(request)
+
+
+def measure(client, name, url, method='get', **kwargs):
+    """
+    Выполняем запрос и сверяем его с бюджетом маршрута.
+
+    Возвращаем ответ и текст ошибки; текст пуст, если бюджет соблюдён.
+    """
+    budget = BUDGETS[name]
+    warm_auth(client)
+    with capture_queries() as queries:
+        start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        milliseconds = (time.perf_counter() - start) * 1000
+    if len(queries) > budget.queries or milliseconds > budget.milliseconds:
+        return response, report(name, budget, queries, milliseconds)
+    return response, ''
@@ -4,11 +4,13 @@ import pytest
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client
+from django.core.cache import caches
+from django.test import Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
 from news.models import Comment, News
+from .budgets import measure
 
 User = get_user_model()
 
@@ -19,6 +21,58 @@ def enable_db_access_for_all_tests():
     pass
 
 
+@pytest.fixture(scope='session', autouse=True)
+def local_cache():
+    """Тесты, включая создание тестовой базы, не трогают кэш проекта."""
+    with override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sessions',
+        },
+        'fragments': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fragments',
+        },
+    }):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def read_from_default(settings):
+    """
+    Соединение-реплика в тестах — второе соединение к той же базе и не
+    видит данных из незавершённой транзакции теста. Разделение чтений
+    проверяется отдельно, в test_routers с transactional_db.
+    """
+    settings.READ_REPLICA_ALIAS = None
+
+
+@pytest.fixture
+def request_budget():
+    """
+    Запрос к странице с проверкой бюджета запросов и времени.
+
+    Пример: request_budget(client, 'news:detail', args=(news.id,)).
+    """
+    def check(client, name, args=(), method='get', **kwargs):
+        response, error = measure(
+            client, name, reverse(name, args=args), method, **kwargs
+        )
+        if error:
+            pytest.fail(error, pytrace=False)
+        return response
+    return check
+
+
 @pytest.fixture
 def author():
     return User.objects.create_user(username='Комментатор')
@@ -0,0 +1,77 @@
+import importlib
+import re
+from contextlib import contextmanager
+
+import pytest
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import clear_url_caches
+
+import news.urls
+import yanews.urls
+from news import views
+from news.models import Comment
+
+CSRF_TOKEN = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+def reload_urls():
+    importlib.reload(news.urls)
+    importlib.reload(yanews.urls)
+    clear_url_caches()
+
+
+@contextmanager
+def async_views(settings):
+    settings.NEWS_ASYNC_VIEWS = True
+    reload_urls()
+    try:
+        yield
+    finally:
+        settings.NEWS_ASYNC_VIEWS = False
+        reload_urls()
+
+
+def asgi_request(method, url, user=None, data=None):
+    client = AsyncClient()
+    if user is not None:
+        async_to_sync(client.aforce_login)(user)
+    return async_to_sync(getattr(client, method))(url, data or {})
+
+
+def page(response):
+    assert response.status_code == 200
+    return CSRF_TOKEN.sub(b'', response.content)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('home', 'detail'))
+def test_async_pages_match_sync(
+    name, settings, client, author, author_client, news_urls, comment
+):
+    url = news_urls[name]
+    expected = [page(client.get(url)), page(author_client.get(url))]
+    with async_views(settings):
+        assert views.AsyncNewsList.view_is_async
+        assert [
+            page(asgi_request('get', url)),
+            page(asgi_request('get', url, author)),
+        ] == expected
+
+
+@pytest.mark.django_db
+def test_async_detail_accepts_comment(settings, author, news_urls, news):
+    with async_views(settings):
+        response = asgi_request(
+            'post', news_urls['detail'], author, {'text': 'Из ASGI'}
+        )
+    assert response.status_code == 302
+    assert Comment.objects.get(news=news).text == 'Из ASGI'
+
+
+@pytest.mark.django_db
+def test_async_detail_missing_news(settings):
+    with async_views(settings):
+        response = asgi_request('get', '/news/0/')
+    assert response.status_code == 404
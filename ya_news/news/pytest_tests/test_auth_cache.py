@@ -0,0 +1,77 @@
+import pytest
+
+from django.contrib.sessions.models import Session
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+
+from users.auth import user_cache, user_cache_key
+from users.sessions import SessionStore
+
+
+@pytest.mark.django_db
+def test_warm_authenticated_page_makes_no_queries(
+    author_client, news_urls, django_assert_num_queries
+):
+    author_client.get(news_urls['home'])
+    with django_assert_num_queries(0):
+        response = author_client.get(news_urls['home'])
+    assert response.context['user'].is_authenticated
+
+
+@pytest.mark.django_db
+def test_password_change_logs_out_cached_user(
+    author, author_client, news_urls
+):
+    author_client.get(news_urls['home'])
+    author.set_password('новый-пароль')
+    author.save()
+    response = author_client.get(news_urls['home'])
+    assert not response.context['user'].is_authenticated
+
+
+@pytest.mark.django_db
+def test_logout_forgets_cached_user(author, author_client, news_urls,
+                                    user_urls):
+    author_client.get(news_urls['home'])
+    assert user_cache().get(user_cache_key(author.pk)) is not None
+    author_client.post(user_urls['logout'])
+    assert user_cache().get(user_cache_key(author.pk)) is None
+
+
+@pytest.mark.django_db
+def test_session_changes_are_written_behind():
+    session = SessionStore()
+    session['theme'] = 'светлая'
+    session.create()
+    session = SessionStore(session.session_key)
+    session['theme'] = 'тёмная'
+    session.save()
+
+    stored = Session.objects.get(session_key=session.session_key)
+    assert stored.get_decoded()['theme'] == 'светлая'
+    assert SessionStore(session.session_key)['theme'] == 'тёмная'
+
+    session._cache.delete(session.written_key)
+    session.save()
+    stored.refresh_from_db()
+    assert stored.get_decoded()['theme'] == 'тёмная'
+
+
+@pytest.mark.django_db
+def test_login_is_written_through(client, author, news_urls):
+    client.force_login(author)
+    caches['sessions'].clear()
+    response = client.get(news_urls['home'])
+    assert response.context['user'] == author
+
+
+@pytest.mark.django_db
+def test_default_cache_eviction_keeps_sessions(
+    author, author_client, news_urls, django_assert_num_queries
+):
+    author_client.get(news_urls['home'])
+    caches['default'].clear()
+    session_key = author_client.cookies['sessionid'].value
+    with django_assert_num_queries(0):
+        session = SessionStore(session_key)
+        assert session[SESSION_KEY] == str(author.pk)
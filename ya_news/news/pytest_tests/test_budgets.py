@@ -0,0 +1,62 @@
+import pytest
+
+from django.urls import reverse
+
+from news.models import Comment, News
+from news.views import NewsList
+from .budgets import BUDGETS, fingerprint, measure
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('news:home', 'news:search'))
+def test_list_pages_within_budget(
+    request_budget, author_client, bulk_news, comment, name
+):
+    request_budget(author_client, name, data={'q': 'Новость'})
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('news:detail', 'news:comments'))
+def test_news_pages_within_budget(
+    request_budget, author_client, news_with_comments, author, name
+):
+    Comment.objects.bulk_create(
+        Comment(news=news_with_comments, author=author, text=f'Ещё {index}')
+        for index in range(30)
+    )
+    request_budget(author_client, name, args=(news_with_comments.id,))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('news:edit', 'news:delete'))
+def test_comment_pages_within_budget(
+    request_budget, author_client, comment, name
+):
+    request_budget(author_client, name, args=(comment.id,))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('users:login', 'users:signup'))
+def test_user_pages_within_budget(request_budget, client, name):
+    request_budget(client, name)
+
+
+def test_fingerprint_hides_values():
+    assert fingerprint(
+        "SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'O''Hara'"
+    ) == fingerprint("SELECT * FROM t WHERE id IN (7) AND name = 'x'")
+
+
+@pytest.mark.django_db
+def test_exceeded_budget_reports_repeated_queries(
+    monkeypatch, client, news_list
+):
+    monkeypatch.setitem(BUDGETS, 'news:home', BUDGETS['news:home']._replace(
+        queries=1
+    ))
+    monkeypatch.setattr(NewsList, 'get_queryset', lambda view: [
+        News.objects.get(pk=item.pk) for item in news_list
+    ])
+    _, error = measure(client, 'news:home', reverse('news:home'))
+    assert error.startswith(f'news:home: {len(news_list)} запросов')
+    assert f'{len(news_list)} × SELECT' in error
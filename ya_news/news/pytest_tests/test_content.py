@@ -1,8 +1,16 @@
 import pytest
+from http import HTTPStatus
+from io import StringIO
+
 from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
 from django.urls import reverse
 
+from news.cache import HOME_FRAGMENT, get_version
 from news.forms import CommentForm
+from news.models import Comment, News
 
 
 @pytest.mark.django_db
@@ -37,3 +45,189 @@ def test_authorized_client_has_form(author_client, detail_url):
     response = author_client.get(detail_url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], CommentForm)
+
+
+@pytest.mark.django_db
+def test_detail_shows_first_comments_page(client, detail_url, settings):
+    settings.COMMENTS_PAGE_SIZE = 4
+    response = client.get(detail_url)
+    comments = response.context['comments']
+    assert len(comments) == settings.COMMENTS_PAGE_SIZE
+    assert response.context['next_cursor'] is not None
+
+
+@pytest.mark.django_db
+def test_comments_pages_cover_whole_thread(
+    client,
+    news_with_comments,
+    settings
+):
+    settings.COMMENTS_PAGE_SIZE = 4
+    url = reverse('news:comments', args=(news_with_comments.id,))
+    cursor = ''
+    seen = []
+    while cursor is not None:
+        response = client.get(url, {'after': cursor})
+        seen.extend(response.context['comments'])
+        cursor = response.context['next_cursor']
+    expected = list(news_with_comments.comment_set.order_by('created', 'id'))
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_comments_page_rejects_broken_cursor(client, news):
+    url = reverse('news:comments', args=(news.id,))
+    response = client.get(url, {'after': 'не-курсор'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    'backend', [
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.filebased.FileBasedCache',
+    ]
+)
+@pytest.mark.django_db
+def test_home_page_is_served_from_cache(client, news, settings, tmp_path,
+                                        backend,
+                                        django_capture_on_commit_callbacks):
+    settings.CACHES = {
+        alias: {'BACKEND': backend, 'LOCATION': str(tmp_path / alias)}
+        for alias in ('default', 'sessions', 'fragments')
+    }
+    home_url = reverse('news:home')
+    client.get(home_url)
+    News.objects.filter(pk=news.pk).update(title='Без сигнала')
+    response = client.get(home_url)
+    assert news.title in response.content.decode()
+    assert 'Без сигнала' not in response.content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        News.objects.create(title='Свежая новость', text='Текст')
+    response = client.get(home_url)
+    assert 'Свежая новость' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_session_eviction_keeps_fragments(author_client, news):
+    home_url = reverse('news:home')
+    author_client.get(home_url)
+    caches['default'].clear()
+    caches['sessions'].clear()
+    News.objects.filter(pk=news.pk).update(title='Без сигнала')
+    response = author_client.get(home_url)
+    assert news.title in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_new_comment_invalidates_home_page(
+    author_client, news, django_capture_on_commit_callbacks
+):
+    home_url = reverse('news:home')
+    author_client.get(home_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(
+            reverse('news:detail', args=(news.id,)),
+            data={'text': 'Комментарий'}
+        )
+    response = author_client.get(home_url)
+    assert 'Комментариев: 1' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_fragment_version_changes_only_after_commit(
+    author, news, django_capture_on_commit_callbacks
+):
+    version = get_version(HOME_FRAGMENT)
+    with django_capture_on_commit_callbacks() as callbacks:
+        with transaction.atomic():
+            Comment.objects.create(
+                news=news, author=author, text='Комментарий'
+            )
+        assert get_version(HOME_FRAGMENT) == version
+    for callback in callbacks:
+        callback()
+    assert get_version(HOME_FRAGMENT) != version
+
+
+@pytest.mark.django_db
+def test_detail_controls_only_for_comment_author(
+    author_client,
+    reader_client,
+    comment,
+    comment_urls
+):
+    author_page = author_client.get(comment_urls['detail']).content.decode()
+    reader_page = reader_client.get(comment_urls['detail']).content.decode()
+    assert comment_urls['edit'] in author_page
+    assert comment_urls['delete'] in author_page
+    assert comment_urls['edit'] not in reader_page
+    assert comment_urls['delete'] not in reader_page
+
+
+@pytest.mark.django_db
+def test_detail_comments_served_from_cache(
+    client,
+    detail_url,
+    django_assert_num_queries
+):
+    client.get(detail_url)
+    with django_assert_num_queries(1):
+        client.get(detail_url)
+
+
+def search(client, query, **params):
+    response = client.get(reverse('news:search'), {'q': query, **params})
+    return response.context['object_list']
+
+
+@pytest.mark.django_db
+def test_search_finds_news_and_comments(client, comment):
+    results = search(client, 'комментар')
+    assert [result.news_id for result in results] == [comment.news_id]
+    assert results[0].is_comment
+    assert '<mark>Комментарий</mark>' in results[0].snippet
+    results = search(client, comment.news.title)
+    assert not results[0].is_comment
+
+
+@pytest.mark.django_db
+def test_search_index_follows_changes(client, comment):
+    comment.text = 'Совсем другой текст'
+    comment.save()
+    assert not search(client, 'комментарий')
+    assert search(client, 'другой')
+    comment.news.delete()
+    assert not search(client, 'другой')
+
+
+@pytest.mark.django_db
+def test_search_results_are_paginated(client, settings, news):
+    settings.SEARCH_RESULTS_PER_PAGE = 2
+    for index in range(3):
+        News.objects.create(title=f'Погода {index}', text='Дождь')
+    first_page = search(client, 'дождь')
+    second_page = search(client, 'дождь', page=2)
+    assert len(first_page) == 2
+    assert len(second_page) == 1
+    titles = {result.title for result in first_page + second_page}
+    assert titles == {f'Погода {index}' for index in range(3)}
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index_command(client, comment):
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM news_search')
+    assert not search(client, 'комментарий')
+    call_command('rebuild_search_index', chunk_size=1, stdout=StringIO())
+    assert search(client, 'комментарий')
+
+
+@pytest.mark.django_db
+def test_interrupted_rebuild_keeps_index(client, comment, monkeypatch):
+    def broken(comments):
+        raise RuntimeError('Сбой посреди перестройки')
+
+    monkeypatch.setattr('news.search.comment_rows', broken)
+    with pytest.raises(RuntimeError):
+        call_command('rebuild_search_index', stdout=StringIO())
+    assert search(client, 'комментарий')
@@ -0,0 +1,141 @@
+import threading
+
+import pytest
+
+from django.db import OperationalError, connections
+
+from yanews.db import pool
+from yanews.db.base import DatabaseWrapper
+from yanews.metrics import collect, render_text
+
+
+@pytest.fixture(autouse=True)
+def drop_pools():
+    yield
+    for key in [key for key in pool.POOLS if key[0] == 'tuned']:
+        for connection in pool.POOLS.pop(key).idle:
+            connection.close()
+
+
+def open_database(path, **options):
+    wrapper = DatabaseWrapper(
+        {**connections['default'].settings_dict, 'NAME': path,
+         'OPTIONS': options},
+        alias='tuned'
+    )
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_new_connection_applies_pragmas(tmp_path):
+    wrapper = open_database(
+        tmp_path / 'db.sqlite3', pragmas={'cache_size': -2000}
+    )
+    try:
+        assert pragma(wrapper, 'journal_mode') == 'wal'
+        assert pragma(wrapper, 'synchronous') == 1
+        assert pragma(wrapper, 'busy_timeout') == 5000
+        assert pragma(wrapper, 'cache_size') == -2000
+    finally:
+        wrapper.close()
+
+
+@pytest.mark.django_db
+def test_read_only_connection_rejects_writes(tmp_path):
+    path = tmp_path / 'db.sqlite3'
+    primary = open_database(path)
+    replica = open_database(path, read_only=True)
+    try:
+        with primary.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (name TEXT)')
+            cursor.execute("INSERT INTO item VALUES ('запись')")
+        with replica.cursor() as cursor:
+            cursor.execute('SELECT name FROM item')
+            assert cursor.fetchall() == [('запись',)]
+            with pytest.raises(OperationalError):
+                cursor.execute("INSERT INTO item VALUES ('реплика')")
+    finally:
+        replica.close()
+        primary.close()
+
+
+@pytest.mark.django_db
+def test_pool_reuses_connections(tmp_path):
+    wrapper = open_database(tmp_path / 'db.sqlite3', pool=True)
+    connection = wrapper.connection
+    wrapper.close()
+    assert pool.pool_stats()['tuned'] == {
+        'in_use': 0, 'idle': 1, 'waits': 0, 'wait_seconds': 0
+    }
+    wrapper.ensure_connection()
+    assert wrapper.connection is connection
+    assert 'db_pool_connections{alias="tuned",state="in_use"} 1' in (
+        render_text(collect())
+    )
+    wrapper.close()
+
+
+@pytest.mark.django_db
+def test_pool_replaces_broken_connection(tmp_path):
+    wrapper = open_database(tmp_path / 'db.sqlite3', pool=True)
+    connection = wrapper.connection
+    wrapper.close()
+    connection.close()
+    wrapper.ensure_connection()
+    assert wrapper.connection is not connection
+    assert pragma(wrapper, 'journal_mode') == 'wal'
+    wrapper.close()
+
+
+@pytest.mark.django_db
+def test_pool_grows_past_idle_limit(tmp_path):
+    options = {'pool': {'max_idle': 2}}
+    path = tmp_path / 'db.sqlite3'
+    open_database(path, **options).close()
+    barrier = threading.Barrier(5)
+    errors = []
+
+    def hold_connection():
+        try:
+            wrapper = open_database(path, **options)
+            barrier.wait(timeout=5)
+            wrapper.close()
+        except Exception as error:
+            errors.append(error)
+            barrier.abort()
+
+    threads = [threading.Thread(target=hold_connection) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert pool.pool_stats()['tuned'] == {
+        'in_use': 0, 'idle': 2, 'waits': 0, 'wait_seconds': 0
+    }
+
+
+@pytest.mark.django_db
+def test_pool_size_is_capped(tmp_path):
+    options = {'pool': {'max_size': 1, 'timeout': 0.01}}
+    first = open_database(tmp_path / 'db.sqlite3', **options)
+    with pytest.raises(OperationalError):
+        open_database(tmp_path / 'db.sqlite3', **options)
+    assert pool.pool_stats()['tuned']['waits'] == 1
+    first.close()
+    open_database(tmp_path / 'db.sqlite3', **options).close()
+
+
+def test_configured_pools_are_bounded():
+    for alias in connections:
+        options = connections[alias].settings_dict['OPTIONS'].get('pool')
+        if options:
+            options = {} if options is True else options
+            assert {**pool.DEFAULT_POOL, **options}['max_size']
@@ -1,11 +1,18 @@
+import json
 import pytest
 from http import HTTPStatus
+from io import StringIO
 
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
+from news.banned_words import get_matcher
+from news.batching import writer
 from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.loader import FixtureError, iter_objects, load_fixture
+from news.models import BannedWord, Comment, News
 
 User = get_user_model()
 
@@ -29,6 +36,8 @@ def test_user_can_create_comment(author_client, author, news):
     assert comments_after == comments_before + 1
     comment = Comment.objects.get(author=author, text='Тестовый комментарий')
     assert comment.news == news
+    news.refresh_from_db()
+    assert news.comment_count == 1
 
 
 @pytest.mark.django_db
@@ -95,3 +104,251 @@ def test_user_cant_edit_comment_of_another_user(
     assert response.status_code == HTTPStatus.NOT_FOUND
     comment.refresh_from_db()
     assert comment.text == 'Комментарий'
+
+
+@pytest.mark.django_db
+def test_delete_comment_decrements_counter(
+    author_client,
+    comment,
+    comment_urls
+):
+    News.objects.filter(pk=comment.news_id).update(comment_count=1)
+    author_client.post(comment_urls['delete'])
+    comment.news.refresh_from_db()
+    assert comment.news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_recount_comments_command(news_with_comments, news):
+    News.objects.update(comment_count=42)
+    call_command('recount_comments', stdout=None)
+    news_with_comments.refresh_from_db()
+    news.refresh_from_db()
+    assert news_with_comments.comment_count == 10
+    assert news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_bad_words_with_latin_homoglyphs_are_rejected(author_client, news):
+    url = reverse('news:detail', args=(news.id,))
+    disguised = BAD_WORDS[0].upper().replace('Е', 'E').replace('С', 'C')
+    response = author_client.post(url, data={'text': f'Ну ты {disguised}'})
+    assert response.context['form'].errors['text'][0] == WARNING
+    assert not Comment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_banned_word_from_database_applies_without_restart(
+    author_client,
+    news
+):
+    url = reverse('news:detail', args=(news.id,))
+    author_client.post(url, data={'text': 'Ну ты и брокколи'})
+    BannedWord.objects.create(word='брокколи')
+    response = author_client.post(url, data={'text': 'Ну ты и брокколи'})
+    assert response.context['form'].errors['text'][0] == WARNING
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_banned_words_file_is_reloaded(author_client, news, settings,
+                                       tmp_path):
+    settings.BANNED_WORDS_FILE = tmp_path / 'words.txt'
+    settings.BANNED_WORDS_FILE.write_text('# Овощи\nкабачок\n')
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data={'text': 'Ну ты и кабачок'})
+    assert response.context['form'].errors['text'][0] == WARNING
+    assert not Comment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_matcher_is_rebuilt_only_after_changes():
+    matcher = get_matcher()
+    assert get_matcher() is matcher
+    BannedWord.objects.create(word='брокколи')
+    assert get_matcher() is not matcher
+
+
+@pytest.mark.django_db
+def test_matcher_follows_database_not_cache():
+    word = BannedWord.objects.create(word='брокколи')
+    matcher = get_matcher()
+    cache.clear()
+    assert get_matcher() is matcher
+    word.word = 'кабачок'
+    word.save()
+    assert get_matcher().search('Ну ты и кабачок')
+    word.delete()
+    assert not get_matcher().search('Ну ты и кабачок')
+
+
+def test_iter_objects_reads_array_and_ndjson(monkeypatch):
+    monkeypatch.setattr('news.loader.READ_SIZE', 7)
+    objects = [{'pk': number, 'text': 'ё' * number} for number in range(5)]
+    array = StringIO(json.dumps(objects, ensure_ascii=False, indent=2))
+    ndjson = StringIO(''.join(json.dumps(obj) + '\n' for obj in objects))
+    assert list(iter_objects(array)) == objects
+    assert list(iter_objects(ndjson)) == objects
+    with pytest.raises(FixtureError):
+        list(iter_objects(StringIO('[{"pk": 1')))
+
+
+@pytest.mark.django_db
+def test_load_news_command_matches_loaddata():
+    call_command('loaddata', 'news.json')
+    expected = list(News.objects.values_list('title', 'text', 'date'))
+    News.objects.all().delete()
+    call_command('load_news', 'news/fixtures/news.json', '--batch-size=2')
+    assert list(News.objects.values_list('title', 'text', 'date')) == expected
+
+
+@pytest.mark.django_db
+def test_load_fixture_links_comments_to_news(client, author):
+    lines = [
+        {'model': 'news.news', 'pk': 500, 'fields': {
+            'title': 'Загруженная', 'text': 'Текст', 'date': '2024-01-01'
+        }},
+        {'model': 'news.comment', 'pk': 700,
+         'fields': {'news': 500, 'author': author.pk, 'text': 'Первый',
+                    'created': '2024-01-02T10:00:00Z'}},
+        {'model': 'news.comment',
+         'fields': {'news': 500, 'author': [author.username],
+                    'text': 'Второй', 'created': '2024-01-03T10:00:00Z'}},
+    ]
+    file = StringIO('\n'.join(json.dumps(line) for line in lines))
+    assert load_fixture(file, batch_size=1) == 3
+    news = News.objects.get(pk=500)
+    assert news.comment_count == 2
+    first = Comment.objects.get(pk=700)
+    assert (first.news, first.author) == (news, author)
+    assert first.created.isoformat() == '2024-01-02T10:00:00+00:00'
+    response = client.get(reverse('news:search'), {'q': 'второй'})
+    assert len(response.context['object_list']) == 1
+
+
+@pytest.mark.django_db
+def test_load_news_reports_bad_object_position(tmp_path, author):
+    news = {'model': 'news.news', 'pk': 500, 'fields': {
+        'title': 'Загруженная', 'text': 'Текст', 'date': '2024-01-01'
+    }}
+    comment = {'model': 'news.comment', 'fields': {
+        'news': 500, 'author': author.pk, 'text': 'Раньше новости'
+    }}
+    broken = {'model': 'news.news', 'pk': 501, 'fields': {
+        'title': 'Битая', 'text': 'Текст', 'date': 'вчера'
+    }}
+    cases = (
+        ([comment, news], 'Объект 1: нет новости 500'),
+        ([news, broken], 'Объект 2:'),
+    )
+    for objects, message in cases:
+        path = tmp_path / 'fixture.json'
+        path.write_text(json.dumps(objects), encoding='utf-8')
+        with pytest.raises(CommandError, match=message):
+            call_command('load_news', str(path), '--batch-size=1')
+        News.objects.all().delete()
+
+
+def corpus_snapshot():
+    return (
+        list(User.objects.values_list('username', flat=True)),
+        list(News.objects.values_list('title', 'date', 'comment_count')),
+        list(Comment.objects.values_list('news__title', 'text', 'created')),
+    )
+
+
+@pytest.mark.django_db
+def test_generate_corpus_is_deterministic_and_skewed():
+    options = {'users': 5, 'news': 20, 'comments': 300, 'batch_size': 64}
+    call_command('generate_corpus', seed=7, **options)
+    first = corpus_snapshot()
+    User.objects.all().delete()
+    News.objects.all().delete()
+    call_command('generate_corpus', seed=7, **options)
+    assert corpus_snapshot() == first
+    counts = sorted(
+        News.objects.values_list('comment_count', flat=True), reverse=True
+    )
+    assert sum(counts) == 300
+    assert counts[0] > 10 * counts[len(counts) // 2]
+    assert Comment.objects.filter(created__year=2024).count() == 300
+    assert Comment._meta.get_field('created').auto_now_add
+
+
+@pytest.fixture
+def comment_batching(settings):
+    """Очередь без фонового потока: тест сам вызывает writer.flush()."""
+    settings.COMMENT_BATCHING = True
+    yield writer
+    writer.flush()
+
+
+@pytest.mark.django_db
+def test_batched_comment_is_pending_until_flush(
+    comment_batching, author_client, reader_client, news
+):
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data={'text': 'Срочный комментарий'})
+    assert response.status_code == HTTPStatus.FOUND
+    assert not Comment.objects.exists()
+    assert 'Срочный комментарий' in author_client.get(url).content.decode()
+    assert 'Срочный комментарий' not in reader_client.get(url).content.decode()
+
+    assert comment_batching.flush() == 1
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    assert Comment.objects.get().text == 'Срочный комментарий'
+    for client in (author_client, reader_client):
+        content = client.get(url).content.decode()
+        assert content.count('Срочный комментарий') == 1
+        assert 'pending-comments' not in content
+
+
+@pytest.mark.django_db
+def test_batched_comments_are_written_in_batches(
+    comment_batching, settings, author_client, news, news_list
+):
+    settings.COMMENT_BATCH_SIZE = 2
+    for item in (news, *news_list[:2]):
+        author_client.post(
+            reverse('news:detail', args=(item.id,)), data={'text': 'Текст'}
+        )
+    author_client.post(
+        reverse('news:detail', args=(news.id,)), data={'text': 'Ещё'}
+    )
+    assert comment_batching.flush() == 4
+    assert dict(News.objects.values_list('pk', 'comment_count')) == {
+        news.pk: 2, news_list[0].pk: 1, news_list[1].pk: 1,
+        **{item.pk: 0 for item in news_list[2:]},
+    }
+
+
+@pytest.mark.django_db
+def test_comment_to_deleted_news_does_not_drop_batch(
+    comment_batching, author_client, news, news_list
+):
+    for item in (news, news_list[0]):
+        author_client.post(
+            reverse('news:detail', args=(item.id,)), data={'text': 'Текст'}
+        )
+    news_list[0].delete()
+    assert comment_batching.flush() == 1
+    assert list(Comment.objects.values_list('news_id', flat=True)) == [
+        news.id
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_from_deleted_author_does_not_drop_batch(
+    comment_batching, author_client, reader_client, reader, news
+):
+    url = reverse('news:detail', args=(news.id,))
+    author_client.post(url, data={'text': 'Останется'})
+    reader_client.post(url, data={'text': 'Пропадёт'})
+    reader.delete()
+    assert comment_batching.flush() == 1
+    assert list(Comment.objects.values_list('text', flat=True)) == [
+        'Останется'
+    ]
+    news.refresh_from_db()
+    assert news.comment_count == 1
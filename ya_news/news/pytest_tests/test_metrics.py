@@ -0,0 +1,125 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from http import HTTPStatus
+
+import pytest
+
+from django.urls import reverse
+
+from news.forms import BAD_WORDS
+from yanews import metrics
+from .test_async_views import asgi_request, async_views
+
+
+def sample(name, **labels):
+    """Текущее значение серии; метки — в порядке объявления метрики."""
+    text = metrics.render_text(metrics.collect())
+    label_text = metrics.format_labels(labels, labels.values())
+    match = re.search(
+        rf'^{re.escape(name + label_text)} (\S+)$', text, re.MULTILINE
+    )
+    return float(match[1]) if match else 0
+
+
+@pytest.mark.django_db
+def test_requests_and_queries_are_counted_per_view(client, news,
+                                                   settings):
+    before = sample(
+        'http_requests_total', view='news:home', method='GET', status='200'
+    )
+    queries = sample('db_queries_total', view='news:home')
+    client.get(reverse('news:home'))
+    settings.METRICS_TOKEN = 'секрет'
+    response = client.get(
+        reverse('metrics'), headers={'Authorization': 'Bearer секрет'}
+    )
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode()
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert (
+        'http_request_duration_seconds_bucket{view="news:home",le="+Inf"}'
+    ) in text
+    assert sample(
+        'http_requests_total', view='news:home', method='GET', status='200'
+    ) == before + 1
+    assert sample('db_queries_total', view='news:home') > queries
+
+
+@pytest.mark.django_db
+def test_async_view_queries_are_counted(settings, news_urls, news):
+    queries = sample('db_queries_total', view='news:detail')
+    with async_views(settings):
+        asgi_request('get', news_urls['detail'])
+    assert sample('db_queries_total', view='news:detail') > queries
+
+
+@pytest.mark.django_db
+def test_comment_and_profanity_counters(author_client, detail_url):
+    submitted = sample('news_comments_submitted_total')
+    rejected = sample('news_profanity_rejections_total')
+    author_client.post(detail_url, data={'text': 'Хорошая новость'})
+    author_client.post(detail_url, data={'text': f'Ты {BAD_WORDS[0]}'})
+    assert sample('news_comments_submitted_total') == submitted + 1
+    assert sample('news_profanity_rejections_total') == rejected + 1
+
+
+@pytest.mark.django_db
+def test_fragment_cache_hits_and_misses(client, news):
+    name = 'news_fragment_cache_requests_total'
+    misses = sample(name, fragment='news:detail', result='miss')
+    hits = sample(name, fragment='news:detail', result='hit')
+    for _ in range(3):
+        client.get(reverse('news:detail', args=(news.id,)))
+    assert sample(name, fragment='news:detail', result='miss') == misses + 1
+    assert sample(name, fragment='news:detail', result='hit') == hits + 2
+
+
+@pytest.mark.django_db
+def test_metrics_are_not_public(client, author_client, settings):
+    settings.METRICS_TOKEN = 'секрет'
+    url = reverse('metrics')
+    assert client.get(url).status_code == HTTPStatus.FORBIDDEN
+    assert author_client.get(url).status_code == HTTPStatus.FORBIDDEN
+    assert client.get(
+        url, headers={'Authorization': 'Bearer чужой'}
+    ).status_code == HTTPStatus.FORBIDDEN
+
+
+def test_processes_are_aggregated_through_directory(settings, tmp_path):
+    settings.METRICS_DIR = tmp_path
+    own = sample('news_comments_submitted_total')
+    (tmp_path / f'{os.getppid()}.json').write_text(json.dumps({
+        'news_comments_submitted_total': [[[], 5]],
+        'http_request_duration_seconds': [
+            [['news:home'], [1] + [0] * 11 + [0.001]]
+        ],
+    }))
+    assert sample('news_comments_submitted_total') == own + 5
+    assert sample(
+        'http_request_duration_seconds_count', view='news:home'
+    ) >= 1
+
+
+def test_dead_process_counters_are_retired(settings, tmp_path):
+    settings.METRICS_DIR = tmp_path
+    own = sample('news_comments_submitted_total')
+    # pid только что завершившегося процесса.
+    dead = subprocess.run(
+        [sys.executable, '-c', 'import os; print(os.getpid())'],
+        capture_output=True, text=True, check=True
+    ).stdout.strip()
+    (tmp_path / f'{dead}.json').write_text(json.dumps({
+        'news_comments_submitted_total': [[[], 5]],
+        'db_pool_connections': [[['default', 'idle'], 3]],
+    }))
+    assert sample('news_comments_submitted_total') == own + 5
+    assert sample(
+        'db_pool_connections', alias='default', state='idle'
+    ) == 0
+    assert sorted(path.name for path in tmp_path.glob('*.json')) == [
+        f'{os.getpid()}.json', 'retired.json'
+    ]
+    assert sample('news_comments_submitted_total') == own + 5
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from django.urls import reverse
+
+from yanews import profiling
+from .test_async_views import asgi_request, async_views
+
+
+@pytest.fixture(autouse=True)
+def clear_traces():
+    profiling.TRACES.clear()
+
+
+@pytest.fixture
+def staff_client(client, django_user_model):
+    client.force_login(django_user_model.objects.create_user(
+        username='Админ', is_staff=True
+    ))
+    return client
+
+
+@pytest.mark.django_db
+def test_requests_are_not_traced_by_default(client, news):
+    client.get(reverse('news:detail', args=(news.id,)))
+    assert not profiling.TRACES
+
+
+@pytest.mark.django_db
+def test_sampled_request_has_timeline(
+    client, settings, tmp_path, detail_url
+):
+    settings.PROFILING_SAMPLE_RATE = 1
+    settings.PROFILING_FILE = tmp_path / 'traces.jsonl'
+    client.get(detail_url)
+    trace = profiling.TRACES[-1]
+    assert (trace['method'], trace['path'], trace['status']) == (
+        'GET', detail_url, 200
+    )
+    events = {}
+    for event in trace['events']:
+        events.setdefault(event['kind'], []).append(event)
+    assert [event['name'] for event in events['view']] == [
+        'news.views.NewsDetailView'
+    ]
+    assert trace['queries'] == len(events['sql']) > 0
+    assert any(
+        event['origin'].startswith('news/views.py:')
+        for event in events['sql']
+    )
+    templates = {event['name'] for event in events['template']}
+    assert {'news/detail.html', 'news/includes/comments.html'} <= templates
+    assert all(event['duration_ms'] >= 0 for event in trace['events'])
+    saved = json.loads(settings.PROFILING_FILE.read_text().splitlines()[-1])
+    assert saved['id'] == trace['id']
+
+
+@pytest.mark.django_db
+def test_traces_page_is_for_staff_only(
+    client, author_client, staff_client, settings, news
+):
+    settings.PROFILING_SAMPLE_RATE = 1
+    client.get(reverse('news:home'))
+    trace = profiling.TRACES[-1]
+    url = reverse('traces')
+    assert author_client.get(url).status_code == 302
+    response = staff_client.get(url, {'id': trace['id']})
+    assert response.context['selected'] == trace
+    assert 'news/home.html' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_async_view_trace_has_sql(settings, news_urls, news):
+    settings.PROFILING_SAMPLE_RATE = 1
+    with async_views(settings):
+        asgi_request('get', news_urls['detail'])
+    trace = profiling.TRACES[-1]
+    assert [
+        event['name'] for event in trace['events'] if event['kind'] == 'view'
+    ] == ['news.views.AsyncNewsDetail']
+    assert trace['queries'] > 0
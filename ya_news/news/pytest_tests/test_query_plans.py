@@ -0,0 +1,42 @@
+import re
+
+import pytest
+from django.db.models import Q
+from django.utils import timezone
+
+from news.models import Comment
+from news.views import NewsList
+
+# Полный просмотр таблицы без индекса или сортировка во временном B-дереве
+# означают, что запрос перестал попадать в индекс.
+FULL_SCAN = re.compile(r'\bSCAN \w+$', re.MULTILINE)
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def assert_uses_index(queryset):
+    plan = queryset.explain()
+    assert not FULL_SCAN.search(plan), plan
+    assert TEMP_SORT not in plan, plan
+
+
+@pytest.mark.django_db
+def test_home_page_query_uses_index():
+    assert_uses_index(NewsList().get_queryset())
+
+
+@pytest.mark.django_db
+def test_comment_thread_query_uses_index(news):
+    thread = Comment.objects.filter(news=news).select_related('author')
+    assert_uses_index(thread.order_by('created', 'pk')[:10])
+    now = timezone.now()
+    assert_uses_index(
+        thread.filter(
+            Q(created__gt=now) | Q(created=now, pk__gt=1)
+        ).order_by('created', 'pk')[:10]
+    )
+
+
+@pytest.mark.django_db
+def test_comment_ownership_query_uses_index(author):
+    assert_uses_index(Comment.objects.filter(author=author, pk=1))
+    assert_uses_index(Comment.objects.filter(author=author).order_by('pk'))
@@ -0,0 +1,65 @@
+import pytest
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from yanews.routers import PIN_COOKIE
+from .budgets import capture_queries
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica']
+)
+
+
+@pytest.fixture(autouse=True)
+def read_from_replica(settings):
+    settings.READ_REPLICA_ALIAS = 'replica'
+
+
+def queries_by_alias(client, method, url, **kwargs):
+    with (
+        CaptureQueriesContext(connections['default']) as default,
+        CaptureQueriesContext(connections['replica']) as replica,
+    ):
+        response = getattr(client, method)(url, **kwargs)
+    return response, len(default), len(replica)
+
+
+def test_read_only_pages_read_from_replica(author_client, news, comment):
+    for url in (reverse('news:home'), reverse('news:detail', args=(news.id,))):
+        response, default, replica = queries_by_alias(
+            author_client, 'get', url
+        )
+        assert response.status_code == 200
+        assert (default, replica > 0) == (0, True), url
+
+
+def test_other_pages_read_from_default(author_client, comment_urls):
+    _, _, replica = queries_by_alias(
+        author_client, 'get', comment_urls['edit']
+    )
+    assert replica == 0
+
+
+def test_reads_are_pinned_to_default_after_write(author_client, news):
+    url = reverse('news:detail', args=(news.id,))
+    response, _, replica = queries_by_alias(
+        author_client, 'post', url, data={'text': 'Новый комментарий'}
+    )
+    assert response.status_code == 302
+    assert replica == 0
+    assert PIN_COOKIE in response.cookies
+
+    response, _, replica = queries_by_alias(author_client, 'get', url)
+    assert replica == 0
+    assert 'Новый комментарий' in response.content.decode()
+
+
+def test_budgets_count_replica_queries(author_client, news):
+    with capture_queries() as queries:
+        _, default, replica = queries_by_alias(
+            author_client, 'get', reverse('news:home')
+        )
+    assert replica > 0
+    assert len(queries) == default + replica
@@ -0,0 +1,220 @@
+"""
+Полнотекстовый поиск по новостям и комментариям.
+
+Индекс — таблица FTS5 news_search. Новости и комментарии хранятся в ней
+вместе; rowid записи кодирует тип объекта и его id, поэтому обновление и
+удаление одной записи не требуют просмотра индекса. Индекс обновляется
+сигналами при сохранении и удалении объектов, а команда
+rebuild_search_index заполняет его заново потоково, пачками.
+"""
+import re
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, News
+
+SEARCH_TABLE = 'news_search'
+NEWS, COMMENT = 0, 1
+# Служебные символы вместо тегов подсветки, см. highlight().
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+TERM = re.compile(r'\w+')
+
+SEARCH_SQL = f"""
+    SELECT
+        {SEARCH_TABLE}.rowid,
+        {SEARCH_TABLE}.news_id,
+        news_news.title,
+        snippet(
+            {SEARCH_TABLE}, 1, '{MARK_START}', '{MARK_END}', '…',
+            {SNIPPET_TOKENS}
+        )
+    FROM {SEARCH_TABLE}
+    JOIN news_news ON news_news.id = {SEARCH_TABLE}.news_id
+    WHERE {SEARCH_TABLE} MATCH %s
+    ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0)
+    LIMIT %s OFFSET %s
+"""
+COUNT_SQL = (
+    f'SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+)
+DELETE_SQL = f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s'
+INSERT_SQL = (
+    'INSERT INTO {table}(rowid, title, text, news_id) '
+    'VALUES (%s, %s, %s, %s)'
+)
+# Таблица, в которой rebuild_index строит новый индекс.
+SHADOW_TABLE = f'{SEARCH_TABLE}_rebuild'
+CREATE_SQL = """
+    CREATE VIRTUAL TABLE {table} USING fts5(
+        title,
+        text,
+        news_id UNINDEXED,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+
+def search_rowid(kind, pk):
+    return pk * 2 + kind
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def news_rows(news_items):
+    return [
+        (search_rowid(NEWS, news.pk), news.title, news.text, news.pk)
+        for news in news_items
+    ]
+
+
+def comment_rows(comments):
+    return [
+        (search_rowid(COMMENT, comment.pk), '', comment.text, comment.news_id)
+        for comment in comments
+    ]
+
+
+def _insert(table, rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(INSERT_SQL.format(table=table), rows)
+
+
+def _replace(rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(DELETE_SQL, [(row[0],) for row in rows])
+    _insert(SEARCH_TABLE, rows)
+
+
+def index_news(news_items):
+    _replace(news_rows(news_items))
+
+
+def index_comments(comments):
+    _replace(comment_rows(comments))
+
+
+def unindex(kind, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_SQL, (search_rowid(kind, pk),))
+
+
+def rebuild_index(chunk_size):
+    """
+    Строим индекс заново в теневой таблице и подменяем им рабочий.
+
+    Строки читаются через iterator(chunk_size=...), а каждая пачка пишется
+    в теневую таблицу отдельной транзакцией, так что память не зависит от
+    объёма данных, а поиск всё это время отвечает по старому индексу.
+    Подмена идёт одной транзакцией: в ней же дописываются новости и
+    комментарии, созданные за время перестройки, и убираются удалённые.
+    Правка текста за время перестройки попадёт в индекс со следующей
+    правкой или перестройкой. Если перестройка прервётся, рабочий индекс
+    останется прежним.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SHADOW_TABLE}')
+        cursor.execute(CREATE_SQL.format(table=SHADOW_TABLE))
+    sources = (
+        (news_rows, News.objects.only('title', 'text')),
+        (comment_rows, Comment.objects.only('news', 'text')),
+    )
+    indexed = 0
+    last_pks = []
+    for rows, queryset in sources:
+        last_pk = 0
+        items = queryset.order_by('pk').iterator(chunk_size=chunk_size)
+        for chunk in chunked(items, chunk_size):
+            with transaction.atomic():
+                _insert(SHADOW_TABLE, rows(chunk))
+            indexed += len(chunk)
+            last_pk = chunk[-1].pk
+        last_pks.append(last_pk)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for (rows, queryset), last_pk in zip(sources, last_pks):
+            created = list(queryset.filter(pk__gt=last_pk))
+            _insert(SHADOW_TABLE, rows(created))
+            indexed += len(created)
+        for kind, model in ((NEWS, News), (COMMENT, Comment)):
+            cursor.execute(
+                f'DELETE FROM {SHADOW_TABLE} WHERE rowid %% 2 = %s '
+                f'AND (rowid - %s) / 2 NOT IN '
+                f'(SELECT id FROM {model._meta.db_table})',
+                (kind, kind)
+            )
+            indexed -= cursor.rowcount
+        cursor.execute(f'DROP TABLE {SEARCH_TABLE}')
+        cursor.execute(
+            f'ALTER TABLE {SHADOW_TABLE} RENAME TO {SEARCH_TABLE}'
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
+
+
+def build_match(query):
+    """Слова запроса ищутся по префиксу, операторы FTS5 не действуют."""
+    terms = TERM.findall(query)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(
+            MARK_START, '<mark>'
+        ).replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResult:
+
+    def __init__(self, rowid, news_id, title, snippet):
+        self.is_comment = rowid % 2 == COMMENT
+        self.news_id = news_id
+        self.title = title
+        self.snippet = highlight(snippet)
+
+
+class SearchResults:
+    """
+    Результаты поиска, отсортированные по релевантности (bm25).
+
+    Поддерживают count() и срезы, поэтому их можно отдать
+    django.core.paginator.Paginator как обычный QuerySet.
+    """
+
+    def __init__(self, query):
+        self.match = build_match(query)
+
+    def count(self):
+        if self.match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(COUNT_SQL, (self.match,))
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if self.match is None:
+            return []
+        start = key.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                SEARCH_SQL, (self.match, key.stop - start, start)
+            )
+            return [SearchResult(*row) for row in cursor.fetchall()]
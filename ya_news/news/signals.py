@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import HOME_FRAGMENT, bump_on_commit, detail_fragment
+from .models import Comment, News
+from .search import COMMENT, NEWS, index_comments, index_news, unindex
+
+
+@receiver((post_save, post_delete), sender=News)
+def news_changed(sender, instance, **kwargs):
+    """Любое изменение новости меняет главную и её собственную страницу."""
+    bump_on_commit(HOME_FRAGMENT, detail_fragment(instance.pk))
+
+
+@receiver(post_save, sender=News)
+def news_saved(sender, instance, **kwargs):
+    index_news([instance])
+
+
+@receiver(post_delete, sender=News)
+def news_deleted(sender, instance, **kwargs):
+    unindex(NEWS, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """На главной виден только счётчик, правка текста его не меняет."""
+    if created:
+        bump_on_commit(HOME_FRAGMENT)
+    bump_on_commit(detail_fragment(instance.news_id))
+    index_comments([instance])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump_on_commit(HOME_FRAGMENT, detail_fragment(instance.news_id))
+    unindex(COMMENT, instance.pk)
@@ -1,39 +1,126 @@
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.views import generic
 
+from .batching import pending_comments, writer
+from .cache import (
+    HOME_FRAGMENT,
+    aget_fragment,
+    detail_fragment,
+    get_fragment
+)
 from .forms import CommentForm
+from .metrics import COMMENTS_SUBMITTED
 from .models import Comment, News
+from .overlay import add_owner_controls
+from .pagination import akeyset_page, keyset_page
+from .search import SearchResults
 
 
 class NewsList(generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    read_replica = True
 
     def get_queryset(self):
         """
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Количество комментариев берём из счётчика comment_count,
+        поэтому сами комментарии не загружаются.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
+        return self.model.objects.only(
+            'title', 'text', 'date', 'comment_count'
         )[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
+    def get_context_data(self, **kwargs):
+        """
+        Список новостей одинаков для всех посетителей.
+
+        Берём его из кэша; запрос к базе выполняется только при промахе.
+        """
+        context = super().get_context_data(**kwargs)
+        context['news_list_html'] = get_fragment(
+            HOME_FRAGMENT,
+            lambda: render_to_string(
+                'news/includes/news_list.html',
+                {'object_list': context['object_list']}
+            )
+        )
+        return context
+
+
+class NewsSearch(generic.ListView):
+    """Поиск по новостям и комментариям."""
+    template_name = 'news/search.html'
+
+    def get_paginate_by(self, queryset):
+        return settings.SEARCH_RESULTS_PER_PAGE
+
+    def get_queryset(self):
+        return SearchResults(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+def first_comments(news):
+    return Comment.objects.filter(news=news).select_related('author')
+
+
+def render_detail_body(news, comments, next_cursor):
+    return render_to_string(
+        'news/includes/detail_body.html',
+        {'news': news, 'comments': comments, 'next_cursor': next_cursor}
+    )
+
+
+class NewsDetailMixin:
+    """
+    Общая часть страницы новости: текст и первая страница комментариев.
+
+    Она одинакова для всех читателей, поэтому рендерится один раз на
+    версию новости и хранится в кэше. Для конкретного пользователя поверх
+    неё добавляются только ссылки управления его комментариями.
+    """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['detail_html'] = add_owner_controls(
+            get_fragment(
+                detail_fragment(self.object.pk), self.render_detail
+            ),
+            self.request.user
+        )
+        context['pending_comments'] = pending_comments(
+            self.object.pk, self.request.user
+        )
+        return context
+
+    def render_detail(self):
+        """Показываем только первую страницу комментариев."""
+        return render_detail_body(self.object, *keyset_page(
+            first_comments(self.object), None, settings.COMMENTS_PAGE_SIZE
+        ))
+
 
-class NewsDetail(generic.DetailView):
+class NewsDetail(NewsDetailMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +129,32 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsCommentsPage(generic.TemplateView):
+    """Следующая страница комментариев (фрагмент для «Показать ещё»)."""
+    template_name = 'news/includes/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'], context['next_cursor'] = keyset_page(
+            Comment.objects.filter(
+                news_id=self.kwargs['pk']
+            ).select_related('author'),
+            self.request.GET.get('after'),
+            settings.COMMENTS_PAGE_SIZE
+        )
+        context['news_id'] = self.kwargs['pk']
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        html = render_to_string(self.template_name, context, self.request)
+        return HttpResponse(
+            add_owner_controls(html, self.request.user), **response_kwargs
+        )
+
+
 class NewsComment(
         LoginRequiredMixin,
+        NewsDetailMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -59,7 +170,15 @@ class NewsComment(
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.COMMENT_BATCHING:
+            writer.submit(comment)
+        else:
+            with transaction.atomic():
+                comment.save()
+                News.objects.filter(pk=self.object.pk).update(
+                    comment_count=F('comment_count') + 1
+                )
+        COMMENTS_SUBMITTED.inc()
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -68,6 +187,8 @@ class NewsComment(
 
 
 class NewsDetailView(generic.View):
+    # Только для GET: POST добавляет комментарий и читает из default.
+    read_replica = True
 
     def get(self, request, *args, **kwargs):
         view = NewsDetail.as_view()
@@ -78,6 +199,72 @@ class NewsDetailView(generic.View):
         return view(request, *args, **kwargs)
 
 
+class AsyncNewsList(generic.View):
+    """
+    Список новостей для ASGI.
+
+    То же, что NewsList, но без перехода в поток на весь запрос: в поток
+    уходят только обращения к базе и кэшу через асинхронное API Django.
+    """
+
+    read_replica = True
+
+    async def get(self, request, *args, **kwargs):
+        # Шаблоны обращаются к request.user, а ленивая загрузка
+        # пользователя в асинхронном коде запрещена.
+        request.user = await request.auser()
+
+        async def build():
+            return render_to_string(
+                'news/includes/news_list.html',
+                {'object_list': [
+                    news async for news in
+                    NewsList(request=request).get_queryset().aiterator()
+                ]}
+            )
+
+        return HttpResponse(render_to_string(
+            'news/home.html',
+            {'news_list_html': await aget_fragment(HOME_FRAGMENT, build)},
+            request
+        ))
+
+
+class AsyncNewsDetail(generic.View):
+    """Страница новости для ASGI; комментарий сохраняет NewsComment."""
+
+    read_replica = True
+
+    async def get(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        news = await aget_object_or_404(News, pk=kwargs['pk'])
+
+        async def build():
+            return render_detail_body(news, *await akeyset_page(
+                first_comments(news), None, settings.COMMENTS_PAGE_SIZE
+            ))
+
+        context = {
+            'object': news,
+            'news': news,
+            'detail_html': add_owner_controls(
+                await aget_fragment(detail_fragment(news.pk), build),
+                request.user
+            ),
+            'pending_comments': pending_comments(news.pk, request.user),
+        }
+        if request.user.is_authenticated:
+            context['form'] = CommentForm()
+        return HttpResponse(
+            render_to_string('news/detail.html', context, request)
+        )
+
+    async def post(self, request, *args, **kwargs):
+        return await sync_to_async(NewsComment.as_view())(
+            request, *args, **kwargs
+        )
+
+
 class CommentBase(LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
@@ -102,3 +289,20 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def form_valid(self, form):
+        """Удаляем комментарий и уменьшаем счётчик у новости."""
+        success_url = self.get_success_url()
+        with transaction.atomic():
+            self.object.delete()
+            News.objects.filter(
+                pk=self.object.news_id, comment_count__gt=0
+            ).update(
+                comment_count=F('comment_count') - 1
+            )
+        return HttpResponseRedirect(success_url)
+
+    def delete(self, request, *args, **kwargs):
+        """DELETE-запрос тоже должен обновлять счётчик."""
+        self.object = self.get_object()
+        return self.form_valid(self.get_form())
@@ -3,9 +3,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.shortcuts import redirect, render
 
+from .auth import forget_user
+
 
 @login_required
 def user_logout(request):
+    forget_user(request.user.pk)
     logout(request)
     return render(request, 'registration/logged_out.html')
 
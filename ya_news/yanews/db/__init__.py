@@ -0,0 +1,11 @@
+"""
+SQLite с настройками для работы под нагрузкой.
+
+ENGINE = 'yanews.db': при каждом новом соединении применяются PRAGMA из
+DEFAULT_PRAGMAS, переопределённые ключом OPTIONS['pragmas'] (значение
+None убирает PRAGMA). OPTIONS['read_only'] открывает базу только на
+чтение — так настраивается соединение-реплика для страниц, которые
+только читают. OPTIONS['pool'] включает пул соединений процесса (см.
+pool). Остальные OPTIONS, в том числе init_command и transaction_mode,
+обрабатывает стандартный бэкенд Django.
+"""
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from django.db.backends.sqlite3 import base
+
+from .pool import get_pool
+
+# WAL пускает читателей параллельно с писателем, NORMAL в режиме WAL не
+# теряет целостность при сбое процесса, busy_timeout ждёт блокировку
+# вместо немедленной ошибки «database is locked».
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    # Отрицательный размер — в килобайтах, то есть 64 МБ на соединение.
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Эти PRAGMA пишут в файл базы и недоступны соединению только на чтение.
+WRITE_PRAGMAS = {'journal_mode'}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {
+            **DEFAULT_PRAGMAS, **kwargs.pop('pragmas', {})
+        }
+        self.read_only = kwargs.pop('read_only', False)
+        pool = kwargs.pop('pool', False)
+        # Базу в памяти Django и так не закрывает между запросами.
+        self.pool = (
+            get_pool((self.alias, str(kwargs['database'])), pool)
+            if pool and not self.is_in_memory_db() else None
+        )
+        # Базу в памяти нельзя открыть ещё раз на чтение, для неё остаётся
+        # только запрет записи через query_only.
+        if self.read_only and not self.is_in_memory_db():
+            database = str(kwargs['database'])
+            if not database.startswith('file:'):
+                database = Path(database).resolve().as_uri()
+            separator = '&' if '?' in database else '?'
+            kwargs['database'] = f'{database}{separator}mode=ro'
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        if self.pool is not None:
+            return self.pool.acquire(
+                lambda: self.open_connection(conn_params)
+            )
+        return self.open_connection(conn_params)
+
+    def open_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = dict(self.pragmas)
+        if self.read_only:
+            for name in WRITE_PRAGMAS:
+                pragmas.pop(name, None)
+            pragmas['query_only'] = 'ON'
+        for name, value in pragmas.items():
+            if value is not None:
+                connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        if self.in_atomic_block:
+            # Соединение останется у обёртки до rollback, отдавать его
+            # другому потоку нельзя.
+            self.pool.release(None)
+            return super()._close()
+        connection = self.connection
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except base.Database.Error:
+            connection.close()
+            connection = None
+        self.pool.release(connection)
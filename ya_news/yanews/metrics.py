@@ -0,0 +1,461 @@
+"""
+Счётчики и гистограммы в формате Prometheus.
+
+Значения пишутся в словари своего потока, поэтому обновление метрики —
+это обращение к словарю без блокировок; при сборе словари всех потоков
+складываются. Несколько процессов gunicorn объединяются через
+METRICS_DIR: каждый процесс раз в METRICS_FLUSH_INTERVAL секунд
+сохраняет снимок своих значений в файл <pid>.json, а /metrics/ складывает
+все файлы. Файл завершившегося процесса (при выходе или, если процесс
+убит, при следующем сборе) удаляется, а его счётчики и гистограммы
+переносятся в retired.json, чтобы суммы не уменьшались; текущие значения
+(gauge) мёртвого процесса отбрасываются. Каталог нужно очищать при
+перезапуске сервиса, иначе туда же попадут значения прошлого запуска.
+
+/metrics/ доступен сотрудникам и запросам с заголовком
+Authorization: Bearer <METRICS_TOKEN>.
+"""
+import atexit
+import fcntl
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.utils import CursorWrapper
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .db.pool import pool_stats
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+RETIRED = 'retired'
+
+METRICS = {}
+_shards = []
+_shards_lock = threading.Lock()
+_local = threading.local()
+_last_flush = 0
+
+
+def _reset_after_fork():
+    """Дочерний процесс начинает с нуля, иначе значения родителя удвоятся."""
+    global _local, _last_flush
+    _shards.clear()
+    _local = threading.local()
+    _last_flush = 0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _values(name):
+    try:
+        shard = _local.shard
+    except AttributeError:
+        shard = _local.shard = {}
+        with _shards_lock:
+            _shards.append(shard)
+    values = shard.get(name)
+    if values is None:
+        values = shard[name] = {}
+    return values
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        METRICS[name] = self
+
+    def empty(self):
+        return 0
+
+    def merge(self, total, value):
+        return total + value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        values = _values(self.name)
+        values[labels] = values.get(labels, 0) + amount
+
+
+class CallbackCounter(Metric):
+    """Счётчик, который при сборе читается из callback() -> {labels: n}."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, callback, labels=()):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+
+class CallbackGauge(CallbackCounter):
+    """Текущее значение из callback(); значения процессов складываются."""
+
+    kind = 'gauge'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def empty(self):
+        # Число наблюдений в каждом интервале, в +Inf и сумма значений.
+        return [0] * (len(self.buckets) + 1) + [0]
+
+    def merge(self, total, value):
+        return [left + right for left, right in zip(total, value)]
+
+    def observe(self, value, *labels):
+        values = _values(self.name)
+        state = values.get(labels)
+        if state is None:
+            state = values[labels] = self.empty()
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+
+def merge_into(total, name, values):
+    metric = METRICS.get(name)
+    if metric is None:
+        return
+    merged = total.setdefault(name, {})
+    for labels, value in values:
+        labels = tuple(labels)
+        merged[labels] = metric.merge(
+            merged.get(labels, metric.empty()), value
+        )
+
+
+def snapshot():
+    """Значения метрик этого процесса: {имя: [(метки, значение), ...]}."""
+    total = {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        for name, values in list(shard.items()):
+            merge_into(total, name, list(dict(values).items()))
+    for metric in METRICS.values():
+        if isinstance(metric, CallbackCounter):
+            merge_into(total, metric.name, metric.callback().items())
+    return {name: list(values.items()) for name, values in total.items()}
+
+
+def flush(force=False):
+    """Сохраняем снимок процесса для /metrics/ не чаще раза в интервал."""
+    global _last_flush
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{os.getpid()}.json'
+    temporary = path.with_suffix(f'.{threading.get_ident()}.tmp')
+    temporary.write_text(json.dumps(snapshot()))
+    os.replace(temporary, path)
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю.
+        return True
+    return True
+
+
+def read_values(path):
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def retire(path):
+    """Переносим счётчики файла процесса в retired.json и удаляем файл."""
+    claimed = path.with_suffix('.retiring')
+    try:
+        # Забирает файл только один из одновременно собирающих процессов.
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return
+    directory = path.parent
+    with open(directory / f'{RETIRED}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = directory / f'{RETIRED}.json'
+        total = {}
+        for values in (read_values(retired_path), read_values(claimed)):
+            for name, series in values.items():
+                metric = METRICS.get(name)
+                if metric is not None and metric.kind != 'gauge':
+                    merge_into(total, name, series)
+        temporary = retired_path.with_suffix(f'.{os.getpid()}.tmp')
+        temporary.write_text(json.dumps({
+            name: list(series.items()) for name, series in total.items()
+        }))
+        os.replace(temporary, retired_path)
+        claimed.unlink()
+
+
+def retire_self():
+    if not settings.METRICS_DIR:
+        return
+    flush(force=True)
+    retire(Path(settings.METRICS_DIR) / f'{os.getpid()}.json')
+
+
+atexit.register(retire_self)
+
+
+def collect():
+    """Значения всех процессов, если задан METRICS_DIR, иначе этого."""
+    if not settings.METRICS_DIR:
+        return {
+            name: dict(values) for name, values in snapshot().items()
+        }
+    flush(force=True)
+    directory = Path(settings.METRICS_DIR)
+    for path in directory.glob('*.json'):
+        if path.stem.isdigit() and not is_alive(int(path.stem)):
+            retire(path)
+    total = {}
+    for path in directory.glob('*.json'):
+        try:
+            process = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # Файл процесса, который как раз сейчас перезаписывается.
+            continue
+        for name, values in process.items():
+            merge_into(total, name, values)
+    return total
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def render_text(values):
+    lines = []
+    for name in sorted(values):
+        metric = METRICS[name]
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels, value in sorted(values[name].items()):
+            if metric.kind != 'histogram':
+                lines.append(
+                    f'{name}{format_labels(metric.labels, labels)} {value}'
+                )
+                continue
+            cumulative = 0
+            bounds = [*map(str, metric.buckets), '+Inf']
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket'
+                    f'{format_labels(metric.labels, labels, [("le", bound)])}'
+                    f' {cumulative}'
+                )
+            label_text = format_labels(metric.labels, labels)
+            lines.append(f'{name}_sum{label_text} {value[-1]}')
+            lines.append(f'{name}_count{label_text} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def has_metrics_access(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_text(collect()), content_type=CONTENT_TYPE)
+
+
+REQUESTS = Counter(
+    'http_requests_total',
+    'Обработанные запросы.',
+    ('view', 'method', 'status')
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса.',
+    ('view',)
+)
+DB_QUERIES = Counter(
+    'db_queries_total',
+    'SQL-запросы, выполненные при обработке запросов.',
+    ('view',)
+)
+DB_QUERY_TIME = Counter(
+    'db_query_duration_seconds_total',
+    'Суммарное время SQL-запросов.',
+    ('view',)
+)
+
+
+def pool_connections():
+    return {
+        (alias, state): stats[state]
+        for alias, stats in pool_stats().items()
+        for state in ('in_use', 'idle')
+    }
+
+
+def pool_field(name):
+    def callback():
+        return {
+            (alias,): stats[name] for alias, stats in pool_stats().items()
+        }
+    return callback
+
+
+DB_POOL_CONNECTIONS = CallbackGauge(
+    'db_pool_connections',
+    'Соединения пула: занятые и свободные.',
+    pool_connections,
+    ('alias', 'state')
+)
+DB_POOL_WAITS = CallbackCounter(
+    'db_pool_waits_total',
+    'Сколько раз запрос ждал свободного соединения пула.',
+    pool_field('waits'),
+    ('alias',)
+)
+DB_POOL_WAIT_TIME = CallbackCounter(
+    'db_pool_wait_seconds_total',
+    'Суммарное ожидание свободного соединения пула.',
+    pool_field('wait_seconds'),
+    ('alias',)
+)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0
+
+
+current_stats = ContextVar('current_query_stats', default=None)
+
+
+def counted_sql(original):
+    @functools.wraps(original)
+    def execute(self, *args, **kwargs):
+        stats = current_stats.get()
+        if stats is None:
+            return original(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            stats.count += 1
+            stats.seconds += time.perf_counter() - started
+
+    execute.counted = True
+    return execute
+
+
+def install_query_stats():
+    """
+    Оборачиваем CursorWrapper.execute и executemany один раз на процесс.
+
+    Под ASGI ORM работает в потоках sync_to_async, а не в потоке
+    промежуточного слоя; contextvar с QueryStats запроса копируется туда.
+    """
+    for name in ('execute', 'executemany'):
+        original = getattr(CursorWrapper, name)
+        if not getattr(original, 'counted', False):
+            setattr(CursorWrapper, name, counted_sql(original))
+
+
+class MetricsMiddleware:
+    """
+    Ставится первым в MIDDLEWARE, чтобы учитывать время всех слоёв.
+
+    Работает и в синхронной, и в асинхронной цепочке, чтобы под ASGI
+    не добавлять переход в поток на каждый запрос.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_query_stats()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.measure(request) as outcome:
+            response = self.get_response(request)
+            outcome['status'] = response.status_code
+        return response
+
+    async def __acall__(self, request):
+        with self.measure(request) as outcome:
+            response = await self.get_response(request)
+            outcome['status'] = response.status_code
+        return response
+
+    @contextmanager
+    def measure(self, request):
+        started = time.perf_counter()
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        outcome = {'status': 500}
+        try:
+            yield outcome
+        finally:
+            current_stats.reset(token)
+            match = request.resolver_match
+            view = match.view_name if match else '<unresolved>'
+            REQUESTS.inc(view, request.method, str(outcome['status']))
+            REQUEST_LATENCY.observe(time.perf_counter() - started, view)
+            DB_QUERIES.inc(view, amount=stats.count)
+            DB_QUERY_TIME.inc(view, amount=stats.seconds)
+            flush()
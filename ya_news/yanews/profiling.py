@@ -0,0 +1,255 @@
+"""
+Выборочное профилирование запросов.
+
+ProfilingMiddleware берёт долю запросов PROFILING_SAMPLE_RATE и пишет для
+каждого временную шкалу: вызов представления, каждый SQL-запрос с
+длительностью и местом в коде проекта, отрисовку каждого шаблона и
+включения, общее время. Трассы хранятся в кольцевом буфере процесса
+(последние PROFILING_BUFFER_SIZE штук) и, если задан PROFILING_FILE,
+дописываются строками JSON в файл с ротацией.
+
+Запрос, не попавший в выборку, стоит одного вызова random(), а отрисовка
+шаблона или SQL-запрос вне выборки — одного чтения contextvar.
+"""
+import functools
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.backends.utils import CursorWrapper
+from django.shortcuts import render
+from django.template.base import Template
+
+current_trace = ContextVar('current_trace', default=None)
+TRACES = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+# Кадры пакета настроек проекта (промежуточные слои, обёртки SQL) не
+# считаются местом, откуда пришёл SQL-запрос.
+SKIPPED_DIR = str(Path(__file__).resolve().parent)
+
+
+class Trace:
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.created = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.events = []
+
+    def offset(self, moment):
+        return round((moment - self.started) * 1000, 3)
+
+    @contextmanager
+    def span(self, kind, name, **details):
+        event = self.start(kind, name, **details)
+        try:
+            yield event
+        finally:
+            self.stop(event)
+
+    def start(self, kind, name, **details):
+        event = {
+            'kind': kind,
+            'name': name,
+            'start_ms': self.offset(time.perf_counter()),
+            **details
+        }
+        self.events.append(event)
+        return event
+
+    def stop(self, event):
+        event['duration_ms'] = round(
+            self.offset(time.perf_counter()) - event['start_ms'], 3
+        )
+
+    def as_dict(self, status):
+        sql = [event for event in self.events if event['kind'] == 'sql']
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': status,
+            'created': self.created.isoformat(),
+            'total_ms': self.offset(time.perf_counter()),
+            'queries': len(sql),
+            'sql_ms': round(sum(event['duration_ms'] for event in sql), 3),
+            'events': self.events,
+        }
+
+
+def origin():
+    """Ближайший к запросу кадр из кода проекта: файл, строка, функция."""
+    base = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base)
+            and not filename.startswith(SKIPPED_DIR)
+            and 'site-packages' not in filename
+        ):
+            return (
+                f'{Path(filename).relative_to(base)}:{frame.f_lineno} '
+                f'in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return None
+
+
+def install_template_timing():
+    """
+    Оборачиваем Template.render один раз на процесс.
+
+    Сигнал template_rendered Django отправляет только в тестах, поэтому
+    время шаблонов и включений снимаем обёрткой метода.
+    """
+    original = Template.render
+    if getattr(original, 'profiled', False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context):
+        trace = current_trace.get()
+        if trace is None:
+            return original(self, context)
+        name = self.origin.template_name or self.name or '<строка>'
+        with trace.span('template', name):
+            return original(self, context)
+
+    render.profiled = True
+    Template.render = render
+
+
+def timed_sql(original):
+    @functools.wraps(original)
+    def execute(self, sql, *args, **kwargs):
+        trace = current_trace.get()
+        if trace is None:
+            return original(self, sql, *args, **kwargs)
+        with trace.span('sql', sql, alias=self.db.alias, origin=origin()):
+            return original(self, sql, *args, **kwargs)
+
+    execute.profiled = True
+    return execute
+
+
+def install_sql_timing():
+    """
+    Оборачиваем CursorWrapper.execute и executemany один раз на процесс.
+
+    connection.execute_wrapper действует на соединения одного потока, а
+    ORM асинхронных представлений работает в потоках sync_to_async. Туда
+    копируется contextvar трассы, поэтому обёртка класса видит её везде.
+    """
+    for name in ('execute', 'executemany'):
+        original = getattr(CursorWrapper, name)
+        if not getattr(original, 'profiled', False):
+            setattr(CursorWrapper, name, timed_sql(original))
+
+
+@functools.lru_cache(maxsize=None)
+def trace_file_logger(path):
+    logger = logging.getLogger(f'{__name__}.file')
+    logger.propagate = False
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=settings.PROFILING_FILE_MAX_BYTES,
+        backupCount=settings.PROFILING_FILE_BACKUP_COUNT,
+        encoding='utf-8'
+    )
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def store(trace):
+    TRACES.append(trace)
+    if settings.PROFILING_FILE:
+        trace_file_logger(str(settings.PROFILING_FILE)).info(
+            json.dumps(trace, ensure_ascii=False)
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Ставится последним в MIDDLEWARE, чтобы время представления не
+    включало process_view остальных промежуточных слоёв.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timing()
+        install_sql_timing()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        with self.trace(request) as outcome:
+            response = self.get_response(request)
+            outcome['status'] = response.status_code
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return await self.get_response(request)
+        with self.trace(request) as outcome:
+            response = await self.get_response(request)
+            outcome['status'] = response.status_code
+        return response
+
+    @contextmanager
+    def trace(self, request):
+        trace = Trace(request)
+        token = current_trace.set(trace)
+        outcome = {'status': None}
+        try:
+            yield outcome
+        finally:
+            current_trace.reset(token)
+            view = getattr(request, 'profiling_view', None)
+            if view is not None:
+                trace.stop(view)
+            store(trace.as_dict(outcome['status']))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = current_trace.get()
+        if trace is None:
+            return None
+        view = getattr(view_func, 'view_class', view_func)
+        request.profiling_view = trace.start(
+            'view', f'{view.__module__}.{view.__qualname__}'
+        )
+        return None
+
+
+@staff_member_required
+def trace_list(request):
+    """Последние трассы этого процесса, новые сверху."""
+    traces = list(reversed(TRACES))
+    selected = request.GET.get('id')
+    return render(request, 'profiling/traces.html', {
+        'traces': traces,
+        'selected': next(
+            (trace for trace in traces if trace['id'] == selected), None
+        ),
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+    })
@@ -1,8 +1,13 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from yanews.metrics import metrics_view
+from yanews.profiling import trace_list
+
 urlpatterns = [
     path('', include('news.urls', namespace='news')),
+    path('admin/traces/', trace_list, name='traces'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,33 @@
+"""
+Бенчмарки YaNote.
+
+Запускаются из директории ya_note как модули, например:
+python -m benchmarks.routes
+"""
+import os
+import tempfile
+from pathlib import Path
+
+
+def setup_django(database=None):
+    """
+    Настраиваем Django на отдельную базу для замеров.
+
+    Если путь не передан, база создаётся во временной директории, чтобы
+    синтетические данные не попадали в рабочую db.sqlite3.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    if database is None:
+        database = Path(tempfile.mkdtemp()) / 'benchmark.sqlite3'
+    for database_settings in settings.DATABASES.values():
+        database_settings['NAME'] = database
+    # Файловый кэш — рядом с базой замера, а не общий с проектом.
+    for alias, cache_settings in settings.CACHES.items():
+        cache_settings['LOCATION'] = Path(database).parent / 'cache' / alias
+    django.setup()
+    call_command('migrate', verbosity=0)
+    return database
@@ -0,0 +1,397 @@
+"""
+Общая часть замеров страниц: прогон маршрутов, статистика и сравнение.
+
+Каждый размер данных замеряется в отдельном процессе, поэтому пиковый
+RSS относится к одному размеру, а не к сумме всех. Запросы отправляются
+через тестовый клиент Django или по HTTP в WSGI-сервер, запущенный в
+том же процессе; SQL-запросы считаются в обоих случаях.
+"""
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from . import setup_django
+
+SIZES = (10, 10_000, 1_000_000)
+# Разница p95 меньше этого считается шумом, а не регрессией.
+NOISE_MS = 1.0
+# Доля попаданий в кэш фрагментов на тёплом кэше, ниже которой прогон
+# считается неудачным.
+MIN_HIT_RATIO = 0.99
+
+
+class Scenario(NamedTuple):
+    route: str
+    label: str
+    path: str
+    method: str = 'get'
+    data: dict = None
+    user: object = None
+    # Для дорогих страниц вроде экспорта хватает меньшего числа повторов.
+    max_requests: int = None
+
+
+class QueryCounter:
+    """Обёртка выполнения SQL, считающая запросы всех соединений."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        def attach(sender, connection, **kwargs):
+            if self not in connection.execute_wrappers:
+                connection.execute_wrappers.append(self)
+
+        for connection in connections.all():
+            attach(None, connection)
+        # Соединения потока WSGI-сервера создаются позже.
+        connection_created.connect(attach, weak=False)
+        return self
+
+
+class ClientTransport:
+    def __init__(self):
+        self.clients = {}
+
+    def client(self, user):
+        from django.test import Client
+
+        key = user.pk if user else None
+        if key not in self.clients:
+            self.clients[key] = Client()
+            if user:
+                self.clients[key].force_login(user)
+        return self.clients[key]
+
+    def send(self, scenario):
+        response = getattr(self.client(scenario.user), scenario.method)(
+            scenario.path, scenario.data or {}
+        )
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGITransport(ClientTransport):
+    """HTTP-запросы к wsgiref-серверу в соседнем потоке."""
+
+    def __init__(self):
+        from django.core.handlers.wsgi import WSGIHandler
+
+        class Handler(WSGIHandler):
+            def get_response(self, request):
+                # Как и тестовый клиент: замеряем страницы, а не CSRF.
+                request._dont_enforce_csrf_checks = True
+                return super().get_response(request)
+
+        super().__init__()
+        self.server = make_server(
+            '127.0.0.1', 0, Handler(), handler_class=QuietHandler
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def send(self, scenario):
+        headers = {}
+        if scenario.user:
+            session = self.client(scenario.user).cookies['sessionid'].value
+            headers['Cookie'] = f'sessionid={session}'
+        path, body = scenario.path, None
+        if scenario.method == 'get' and scenario.data:
+            path = f'{path}?{urlencode(scenario.data)}'
+        elif scenario.data:
+            body = urlencode(scenario.data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        connection = HTTPConnection(*self.server.server_address)
+        try:
+            connection.request(
+                scenario.method.upper(), path, body=body, headers=headers
+            )
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+TRANSPORTS = {
+    'client': ClientTransport,
+    'wsgi': WSGITransport,
+}
+
+
+def peak_rss_kb():
+    # В Linux ru_maxrss в килобайтах, в macOS — в байтах.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def clear_caches():
+    """Холодный кэш страниц; сессии не трогаем, иначе клиенты разлогинятся."""
+    from django.conf import settings
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        if alias != settings.SESSION_CACHE_ALIAS:
+            caches[alias].clear()
+
+
+def run_scenario(transport, counter, scenario, requests, warmup, cold,
+                 cache_stats=None):
+    requests = min(requests, scenario.max_requests or requests)
+    for _ in range(min(warmup, requests)):
+        transport.send(scenario)
+    hits_before, misses_before = cache_stats() if cache_stats else (0, 0)
+    latencies, queries, statuses = [], [], set()
+    for _ in range(requests):
+        if cold:
+            clear_caches()
+        before = counter.count
+        started = time.perf_counter()
+        statuses.add(transport.send(scenario))
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count - before)
+    quantiles = (
+        statistics.quantiles(latencies, n=100, method='inclusive')
+        if len(latencies) > 1 else latencies * 99
+    )
+    hits, misses = cache_stats() if cache_stats else (0, 0)
+    return {
+        'route': scenario.route,
+        'label': scenario.label,
+        'requests': requests,
+        'status': sorted(statuses),
+        'p50_ms': round(quantiles[49], 3),
+        'p95_ms': round(quantiles[94], 3),
+        'p99_ms': round(quantiles[98], 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': max(queries),
+        'rss_kb': peak_rss_kb(),
+        'cache_hits': hits - hits_before,
+        'cache_misses': misses - misses_before,
+    }
+
+
+def missing_routes(scenarios, namespaces):
+    """Именованные маршруты приложений, для которых нет сценария."""
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    names = {
+        f'{namespace}:{name}'
+        for namespace in namespaces
+        for name in resolver.namespace_dict[namespace][1].reverse_dict
+        if isinstance(name, str)
+    }
+    return sorted(names - {scenario.route for scenario in scenarios})
+
+
+def run_worker(args, prepare, namespaces, cache_stats):
+    database = Path(args.data_dir) / f'routes-{args.worker}-{args.seed}.db'
+    setup_django(database)
+    from django.conf import settings
+
+    # Замеряем как в продакшене: без журнала SQL, который ведёт DEBUG.
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    scenarios = prepare(args.worker, args.seed)
+    for route in missing_routes(scenarios, namespaces):
+        print(f'нет сценария для {route}', file=sys.stderr)
+    counter = QueryCounter().install()
+    transport = TRANSPORTS[args.transport]()
+    try:
+        results = [
+            dict(
+                run_scenario(
+                    transport, counter, scenario,
+                    args.requests, args.warmup, args.cold, cache_stats
+                ),
+                size=args.worker
+            )
+            for scenario in scenarios
+        ]
+    finally:
+        transport.close()
+    print(json.dumps(results))
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Строки отчёта о регрессиях относительно прошлого прогона."""
+    previous = {
+        (row['label'], row['size']): row for row in baseline['results']
+    }
+    regressions = []
+    for row in results:
+        old = previous.get((row['label'], row['size']))
+        if old is None:
+            continue
+        slower = (
+            row['p95_ms'] > old['p95_ms'] * (1 + threshold)
+            and row['p95_ms'] - old['p95_ms'] > NOISE_MS
+        )
+        if slower or row['queries'] > old['queries']:
+            regressions.append(
+                f'{row["label"]} [{row["size"]}]: '
+                f'p95 {old["p95_ms"]} → {row["p95_ms"]} мс, '
+                f'запросов {old["queries"]} → {row["queries"]}'
+            )
+    return regressions
+
+
+def hit_ratio(rows):
+    """Доля попаданий в кэш фрагментов; None, если к нему не обращались."""
+    hits = sum(row.get('cache_hits', 0) for row in rows)
+    total = hits + sum(row.get('cache_misses', 0) for row in rows)
+    return hits / total if total else None
+
+
+def print_table(results):
+    print(f'{"маршрут":<36}{"размер":>9}{"p50":>9}{"p95":>9}{"p99":>9}'
+          f'{"SQL":>5}{"RSS, МБ":>9}{"кэш, %":>8}')
+    for row in results:
+        ratio = hit_ratio([row])
+        ratio = '—' if ratio is None else f'{ratio * 100:.1f}'
+        print(f'{row["label"]:<36}{row["size"]:>9}{row["p50_ms"]:>9.1f}'
+              f'{row["p95_ms"]:>9.1f}{row["p99_ms"]:>9.1f}'
+              f'{row["queries"]:>5}{row["rss_kb"] / 1024:>9.0f}{ratio:>8}')
+
+
+def check_hit_ratio(results, args):
+    """Печатаем долю попаданий; False, если тёплый кэш ниже порога."""
+    ratio = hit_ratio(results)
+    if ratio is None:
+        return True
+    print(f'попаданий в кэш фрагментов: {ratio * 100:.2f}%')
+    if args.cold or ratio >= args.min_hit_ratio:
+        return True
+    print(
+        f'МАЛО ПОПАДАНИЙ: {ratio * 100:.2f}% < '
+        f'{args.min_hit_ratio * 100:.2f}%'
+    )
+    return False
+
+
+def main(module, doc, prepare, namespaces, cache_stats=None):
+    """
+    cache_stats() -> (попадания, промахи) — накопленные счётчики кэша
+    фрагментов процесса; по ним считается доля попаданий каждой страницы.
+    """
+    parser = argparse.ArgumentParser(description=doc)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--transport', choices=TRANSPORTS, default='client')
+    parser.add_argument(
+        '--cold', action='store_true', help='очищать кэш перед запросом'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--data-dir',
+        default='.benchmarks',
+        help='где хранить базы с корпусами между прогонами'
+    )
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--compare', help='результаты прошлого прогона')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='допустимый относительный рост p95'
+    )
+    parser.add_argument(
+        '--min-hit-ratio',
+        type=float,
+        default=MIN_HIT_RATIO,
+        help='минимальная доля попаданий в кэш фрагментов без --cold'
+    )
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        return run_worker(args, prepare, namespaces, cache_stats)
+
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    results = []
+    for size in args.sizes:
+        command = [
+            sys.executable, '-m', module, '--worker', str(size),
+            '--requests', str(args.requests), '--warmup', str(args.warmup),
+            '--transport', args.transport, '--seed', str(args.seed),
+            '--data-dir', args.data_dir,
+        ]
+        if args.cold:
+            command.append('--cold')
+        output = subprocess.run(
+            command, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+        results.extend(json.loads(output.splitlines()[-1]))
+    print_table(results)
+    failed = not check_hit_ratio(results, args)
+
+    report = {
+        'revision': git_revision(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'settings': {
+            name: getattr(args, name)
+            for name in ('requests', 'warmup', 'transport', 'cold', 'seed')
+        },
+        'results': results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if baseline.get('settings') != report['settings']:
+            print(
+                'прошлый прогон сделан с другими настройками: '
+                f'{baseline.get("settings")}',
+                file=sys.stderr
+            )
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f'РЕГРЕССИЯ {line}')
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,88 @@
+"""
+Задержка, число SQL-запросов и память для каждой страницы YaNote.
+
+Данные — синтетический корпус (notes.corpus) на 10, 10 000 и миллион
+заметок; базы с корпусами сохраняются в --data-dir и переиспользуются.
+Сравнение с прошлым прогоном:
+
+python -m benchmarks.routes --output new.json --compare old.json
+"""
+from .harness import Scenario, main
+
+NAMESPACES = ('notes', 'users')
+
+
+def prepare(size, seed):
+    """Корпус на size заметок и сценарии для всех маршрутов."""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+    from django.urls import reverse
+
+    from notes.corpus import CorpusGenerator
+    from notes.models import Note
+
+    if not Note.objects.exists():
+        CorpusGenerator(seed, batch_size=5000).generate(
+            users=max(size // 100, 2), notes=size
+        )
+    # Самый активный автор: у него длиннее всего список и экспорт.
+    author = get_user_model().objects.annotate(
+        notes_count=Count('note')
+    ).order_by('-notes_count', 'id').first()
+    note = Note.objects.filter(author=author).order_by('id').first()
+    word = note.title.split()[0]
+    return [
+        Scenario('notes:home', 'notes:home', reverse('notes:home')),
+        Scenario(
+            'notes:list', 'notes:list', reverse('notes:list'), user=author
+        ),
+        Scenario(
+            'notes:list', 'notes:list (следующая страница)',
+            reverse('notes:list'), data={'after': note.id}, user=author
+        ),
+        Scenario(
+            'notes:detail', 'notes:detail',
+            reverse('notes:detail', args=(note.slug,)), user=author
+        ),
+        Scenario(
+            'notes:edit', 'notes:edit',
+            reverse('notes:edit', args=(note.slug,)), user=author
+        ),
+        Scenario(
+            'notes:delete', 'notes:delete',
+            reverse('notes:delete', args=(note.slug,)), user=author
+        ),
+        Scenario(
+            'notes:search', 'notes:search', reverse('notes:search'),
+            data={'q': word}, user=author
+        ),
+        Scenario(
+            'notes:export', 'notes:export', reverse('notes:export'),
+            data={'format': 'ndjson'}, user=author, max_requests=5
+        ),
+        Scenario('notes:add', 'notes:add', reverse('notes:add'), user=author),
+        # Одинаковые заголовки: каждая новая заметка ищет свободный slug.
+        Scenario(
+            'notes:add', 'notes:add (сохранение)', reverse('notes:add'),
+            method='post', data={'title': 'Заметка из замера', 'text': 'Т'},
+            user=author
+        ),
+        Scenario(
+            'notes:import', 'notes:import', reverse('notes:import'),
+            user=author
+        ),
+        Scenario(
+            'notes:success', 'notes:success', reverse('notes:success'),
+            user=author
+        ),
+        Scenario('users:login', 'users:login', reverse('users:login')),
+        Scenario('users:signup', 'users:signup', reverse('users:signup')),
+        Scenario(
+            'users:logout', 'users:logout (аноним)', reverse('users:logout'),
+            method='post'
+        ),
+    ]
+
+
+if __name__ == '__main__':
+    main('benchmarks.routes', __doc__, prepare, NAMESPACES)
@@ -0,0 +1,106 @@
+"""
+Детерминированный синтетический корпус для нагрузочных замеров.
+
+Одинаковые параметры и seed дают одних и тех же пользователей и одни и
+те же заметки. Заметки распределены по авторам по закону Ципфа:
+у нескольких авторов тысячи заметок, у большинства — единицы.
+"""
+import random
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import Note
+from .slugs import slugify_titles
+
+SYLLABLES = (
+    'ба', 'ве', 'ги', 'до', 'ку', 'ла', 'ми', 'но', 'пе', 'ро', 'са', 'ти',
+    'фу', 'ха', 'це', 'ча', 'шо', 'ще', 'ют', 'яр', 'ан', 'ек', 'ил', 'ос',
+)
+VOCABULARY_SIZE = 5000
+
+
+def build_vocabulary(rng, size=VOCABULARY_SIZE):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(1, 4))))
+    return sorted(words)
+
+
+def sentence(rng, vocabulary, low, high):
+    return ' '.join(rng.choices(vocabulary, k=rng.randint(low, high)))
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса для random.choices: вес ранга r — 1 / r ** skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class CorpusGenerator:
+    def __init__(self, seed, batch_size, prefix='corpus', skew=1.1,
+                 password='corpus-password'):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.skew = skew
+        self.password = password
+        self.vocabulary = build_vocabulary(self.rng)
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def create_users(self, count):
+        User = get_user_model()
+        # Хэш считается один раз: PBKDF2 на миллион пользователей —
+        # это часы, а не минуты.
+        password = make_password(self.password)
+        ids = []
+        for batch in self.batches(count):
+            users = User.objects.bulk_create(
+                User(username=f'{self.prefix}{number:07d}', password=password)
+                for number in batch
+            )
+            ids.extend(user.pk for user in users)
+        return ids
+
+    def create_notes(self, count, user_ids):
+        """
+        Заметки пачками.
+
+        Slug — транслитерация заголовка с порядковым номером в
+        шестнадцатеричном виде: номер без дефисов, поэтому slug уникален
+        без запросов к базе.
+        """
+        ranked = list(user_ids)
+        self.rng.shuffle(ranked)
+        weights = zipf_weights(len(ranked), self.skew)
+        title_length = Note._meta.get_field('title').max_length
+        slug_length = Note._meta.get_field('slug').max_length
+        for batch in self.batches(count):
+            titles = [
+                sentence(self.rng, self.vocabulary, 1, 6)[:title_length]
+                for _ in batch
+            ]
+            authors = self.rng.choices(ranked, cum_weights=weights,
+                                       k=len(batch))
+            suffixes = [f'-{self.prefix}{number:x}' for number in batch]
+            with transaction.atomic():
+                Note.objects.bulk_create(
+                    Note(
+                        title=title,
+                        text=sentence(self.rng, self.vocabulary, 5, 150),
+                        slug=base[:slug_length - len(suffix)] + suffix,
+                        author_id=author_id,
+                    )
+                    for title, base, suffix, author_id in zip(
+                        titles, slugify_titles(titles), suffixes, authors
+                    )
+                )
+
+    def generate(self, users, notes):
+        user_ids = self.create_users(users)
+        if notes:
+            self.create_notes(notes, user_ids)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.corpus import CorpusGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу детерминированным синтетическим корпусом '
+        'пользователей и заметок для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--notes', type=int, default=1_000_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель закона Ципфа для числа заметок у автора.'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='corpus',
+            help='Начало имён синтетических пользователей и суффикса slug.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['notes'] and not options['users']:
+            raise CommandError('Для заметок нужны пользователи.')
+        CorpusGenerator(
+            options['seed'],
+            options['batch_size'],
+            prefix=options['prefix'],
+            skew=options['skew'],
+        ).generate(options['users'], options['notes'])
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: пользователей {users}, заметок {notes}.'.format(
+                **options
+            )
+        ))
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.transfer import FORMATS, TransferError, import_notes
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки из файла NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу.')
+        parser.add_argument('--author', required=True, help='Имя автора.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.NOTES_TRANSFER_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or options['path'].rsplit('.')[-1]
+        try:
+            author = get_user_model().objects.get(
+                username=options['author']
+            )
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["author"]}.')
+        with open(options['path'], encoding='utf-8', newline='') as lines:
+            try:
+                imported = import_notes(
+                    lines, file_format, author, options['batch_size']
+                )
+            except TransferError as error:
+                raise CommandError(error)
+        self.stdout.write(
+            self.style.SUCCESS(f'Импортировано заметок: {imported}')
+        )
@@ -0,0 +1,22 @@
+"""Метрики приложения заметок, см. yanote.metrics."""
+from yanote.metrics import CallbackCounter, Counter
+
+from .slugs import slugify_title
+
+
+def slug_cache_requests():
+    info = slugify_title.cache_info()
+    return {('hit',): info.hits, ('miss',): info.misses}
+
+
+SLUG_CACHE = CallbackCounter(
+    'notes_slug_cache_requests_total',
+    'Обращения к кэшу транслитерации заголовков в slug.',
+    slug_cache_requests,
+    ('result',)
+)
+NOTES_IMPORTED = Counter(
+    'notes_imported_total',
+    'Заметки, загруженные импортом.',
+    ('format',)
+)
@@ -0,0 +1,82 @@
+"""
+Полнотекстовый поиск по заметкам.
+
+Индекс — виртуальная таблица FTS5 notes_note_fts поверх notes_note.
+Её синхронизируют триггеры из миграции 0003_note_search, поэтому
+заметки попадают в индекс при любом способе записи, включая bulk_create.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Note
+
+FTS_TABLE = 'notes_note_fts'
+# Служебные символы вместо тегов: текст заметки экранируется целиком,
+# и только потом они превращаются в разметку подсветки.
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+TERM = re.compile(r'\w+')
+
+SEARCH_SQL = f"""
+    SELECT
+        notes_note.id,
+        notes_note.title,
+        notes_note.slug,
+        snippet(
+            {FTS_TABLE}, 1, '{MARK_START}', '{MARK_END}', '…',
+            {SNIPPET_TOKENS}
+        ) AS snippet
+    FROM {FTS_TABLE}
+    JOIN notes_note ON notes_note.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH %s AND notes_note.author_id = %s
+    ORDER BY bm25({FTS_TABLE}, 10.0, 1.0, 0.0)
+    LIMIT %s
+"""
+
+
+def build_match(query, author_id):
+    """
+    Превращаем пользовательский запрос в выражение FTS5.
+
+    Каждое слово берётся в кавычки и ищется по префиксу, поэтому
+    операторы FTS5 во вводе пользователя не действуют. Условие по автору
+    тоже проверяется внутри индекса: пересекаются списки документов, а не
+    отбираются чужие заметки после поиска.
+    """
+    terms = TERM.findall(query)
+    if not terms:
+        return None
+    words = ' '.join(f'"{term}"*' for term in terms)
+    return f'author_id:"{author_id}" AND {{title text}}: ({words})'
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(
+            MARK_START, '<mark>'
+        ).replace(MARK_END, '</mark>')
+    )
+
+
+def search_notes(author, query, limit):
+    """Заметки автора, отсортированные по релевантности (bm25)."""
+    match = build_match(query, author.pk)
+    if match is None:
+        return []
+    notes = list(Note.objects.raw(SEARCH_SQL, (match, author.pk, limit)))
+    for note in notes:
+        note.snippet = highlight(note.snippet)
+    return notes
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
@@ -0,0 +1,177 @@
+"""
+Slug для заметок: транслитерация заголовка и выбор уникального варианта.
+
+Транслитерация даёт тот же результат, что pytils.translit.slugify, но
+вместо сотни проходов str.replace по таблице pytils делает один проход
+str.translate по заранее собранной таблице. Результаты для отдельных
+заголовков кэшируются, а slugify_titles обрабатывает целую пачку
+заголовков одной строкой.
+
+Занятые варианты base и base-N берутся одним запросом по уникальному
+индексу slug, из них выбирается первый свободный: base, base-2, base-3...
+Между выбором и вставкой slug может занять параллельный запрос, поэтому
+сохранение повторяется, если вставка упала на ограничении уникальности.
+"""
+import re
+from functools import lru_cache
+
+from pytils.translit import ALPHABET, TRANSTABLE
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+DEFAULT_SLUG = 'note'
+SLUG_CACHE_SIZE = 4096
+SLUG_ATTEMPTS = 5
+# Сколько символов оставить под суффикс вида -12345.
+SUFFIX_RESERVE = 8
+# Символ больше любого другого в UTF-8: slug >= prefix и slug < prefix + MAX
+# — это «начинается с prefix», но в виде диапазона, который SQLite
+# отвечает по индексу (LIKE в Django нечувствителен к регистру и индекс
+# не использует).
+MAX_CHAR = '\U0010ffff'
+
+AMPERSAND = re.compile(r'&amp;|&')
+SEPARATORS = re.compile(r'[-\s]+')
+NOT_SLUG_CHAR = re.compile(r'[^\w\s-]')
+# Разделитель заголовков в пакетном режиме: не пробел и не входит
+# в алфавит транслитерации, поэтому переживает все преобразования.
+TITLE_SEPARATOR = '\x00'
+
+
+class Translation(dict):
+    """Таблица для str.translate: символы не из алфавита удаляются."""
+
+    def __missing__(self, key):
+        self[key] = None
+        return None
+
+
+def build_translation():
+    """
+    Собираем транслитерацию pytils в одну таблицу.
+
+    Из замен сразу выброшено то, что pytils удаляет последним регулярным
+    выражением (кавычки, апострофы, точки и т. п.).
+    """
+    translation = Translation({ord(TITLE_SEPARATOR): TITLE_SEPARATOR})
+    replacements = {}
+    for symb_in, symb_out in TRANSTABLE:
+        replacements.setdefault(symb_in, symb_out)
+    for char in ALPHABET:
+        if len(char) != 1:
+            # Многобуквенные выходы таблицы с отдельным символом не совпадут.
+            continue
+        translation[ord(char)] = NOT_SLUG_CHAR.sub(
+            '', replacements.get(char, char)
+        )
+    return translation
+
+
+TRANSLATION = build_translation()
+
+
+def transliterate(text):
+    text = AMPERSAND.sub(' and ', text.lower())
+    return SEPARATORS.sub('-', text).translate(TRANSLATION)
+
+
+def slugify_titles(titles):
+    """
+    Пакетный режим для импорта.
+
+    Все заголовки склеиваются в одну строку, поэтому регулярные выражения
+    и транслитерация проходят по данным один раз на всю пачку.
+    """
+    if any(TITLE_SEPARATOR in title for title in titles):
+        # Разделитель внутри заголовка сдвинул бы slug всех следующих.
+        return [slugify_title(title) for title in titles]
+    text = transliterate(TITLE_SEPARATOR.join(titles))
+    return [slug or DEFAULT_SLUG for slug in text.split(TITLE_SEPARATOR)]
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def slugify_title(title):
+    """Slug из заголовка, как у pytils.translit.slugify."""
+    # pytils удаляет NUL вместе с прочими символами не из алфавита.
+    slug = transliterate(title).replace(TITLE_SEPARATOR, '')
+    return slug or DEFAULT_SLUG
+
+
+def taken_slugs(queryset, base, max_length):
+    """Все занятые slug, которые могут совпасть с вариантами base."""
+    if len(base) > max_length - SUFFIX_RESERVE:
+        # Под суффикс base обрезается, и варианты совпадают с ней только
+        # началом.
+        prefix = base[:max_length - SUFFIX_RESERVE]
+        variants = Q(slug__gte=prefix, slug__lt=prefix + MAX_CHAR)
+    else:
+        # Только base и base-N: для base = note не читаем notebook-….
+        prefix = base + '-'
+        variants = Q(slug=base) | Q(
+            slug__gte=prefix, slug__lt=prefix + MAX_CHAR
+        )
+    return set(queryset.filter(variants).values_list('slug', flat=True))
+
+
+def first_free(base, taken, max_length):
+    candidate, number = base, 1
+    while candidate in taken:
+        number += 1
+        suffix = f'-{number}'
+        candidate = base[:max_length - len(suffix)] + suffix
+    return candidate
+
+
+def free_slug(queryset, base, max_length):
+    base = base[:max_length]
+    taken = taken_slugs(queryset, base, max_length)
+    return first_free(base, taken, max_length)
+
+
+def allocate_slugs(queryset, bases, max_length):
+    """
+    Уникальные slug для пачки заметок.
+
+    Один запрос проверяет все base сразу; варианты с суффиксами
+    запрашиваются только для тех base, которые уже заняты или повторяются
+    внутри пачки.
+    """
+    bases = [base[:max_length] for base in bases]
+    taken = set(
+        queryset.filter(slug__in=set(bases)).values_list('slug', flat=True)
+    )
+    checked = set()
+    slugs = []
+    for base in bases:
+        if base in taken and base not in checked:
+            taken |= taken_slugs(queryset, base, max_length)
+            checked.add(base)
+        slug = first_free(base, taken, max_length)
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def save_with_unique_slug(note, base, save):
+    """
+    Сохраняем заметку под первым свободным slug.
+
+    save — метод сохранения модели; при гонке с другим запросом, занявшим
+    тот же slug, выбор повторяется, остальные ошибки целостности
+    пробрасываются как есть.
+    """
+    model = type(note)
+    max_length = model._meta.get_field('slug').max_length
+    others = model.objects.exclude(pk=note.pk)
+    for attempt in range(SLUG_ATTEMPTS):
+        note.slug = free_slug(others, base, max_length)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            if (
+                attempt == SLUG_ATTEMPTS - 1
+                or not others.filter(slug=note.slug).exists()
+            ):
+                raise
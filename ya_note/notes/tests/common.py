@@ -1,8 +1,10 @@
-from django.test import Client, TestCase
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 from notes.models import Note
+from .budgets import measure
 
 User = get_user_model()
 
@@ -23,6 +25,20 @@ ANON_NOTE_TITLE = 'Новая заметка'
 ANON_NOTE_TEXT = 'Текст'
 
 
+# Тесты не трогают файловый кэш проекта.
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    },
+}
+
+
+# Реплика в тестах — второе соединение к той же базе, и данных из
+# незавершённой транзакции TestCase она не видит. Разделение чтений
+# проверяет test_routers.
+@override_settings(READ_REPLICA_ALIAS=None, CACHES=LOCAL_CACHES)
 class NotesTestBase(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -49,3 +65,20 @@ class NotesTestBase(TestCase):
         cls.delete_url = reverse('notes:delete', args=(cls.note.slug,))
         cls.list_url = LIST_URL
         cls.create_url = ADD_URL
+
+    def setUp(self):
+        # id пользователей повторяются между классами, а кэш сессий и
+        # пользователей живёт дольше транзакции теста.
+        for cache in caches.all():
+            cache.clear()
+
+    def assert_within_budget(
+        self, client, name, args=(), method='get', **kwargs
+    ):
+        """Запрос к странице с проверкой бюджета запросов и времени."""
+        response, error = measure(
+            client, name, reverse(name, args=args), method, **kwargs
+        )
+        if error:
+            self.fail(error)
+        return response
@@ -0,0 +1,35 @@
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+
+from users.auth import user_cache, user_cache_key
+from users.sessions import SessionStore
+from .common import LIST_URL, LOGOUT_URL, NotesTestBase
+
+
+class TestCachedAuth(NotesTestBase):
+    def test_warm_authenticated_page_skips_session_and_user(self):
+        self.author_client.get(LIST_URL)
+        with self.assertNumQueries(1):
+            response = self.author_client.get(LIST_URL)
+        self.assertEqual(response.context['user'], self.author)
+
+    def test_password_change_logs_out_cached_user(self):
+        self.author_client.get(LIST_URL)
+        self.author.set_password('новый-пароль')
+        self.author.save()
+        response = self.author_client.get(LIST_URL)
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_forgets_cached_user(self):
+        self.reader_client.get(LIST_URL)
+        self.assertIsNotNone(user_cache().get(user_cache_key(self.reader.pk)))
+        self.reader_client.post(LOGOUT_URL)
+        self.assertIsNone(user_cache().get(user_cache_key(self.reader.pk)))
+
+    def test_default_cache_eviction_keeps_sessions(self):
+        self.author_client.get(LIST_URL)
+        caches['default'].clear()
+        session_key = self.author_client.cookies['sessionid'].value
+        with self.assertNumQueries(0):
+            session = SessionStore(session_key)
+            self.assertEqual(session[SESSION_KEY], str(self.author.pk))
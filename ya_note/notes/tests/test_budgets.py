@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from notes.models import Note
+from notes.views import NotesList
+from .budgets import BUDGETS, fingerprint, measure
+from .common import NotesTestBase
+
+
+class TestQueryBudgets(NotesTestBase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Note.objects.bulk_create(
+            Note(title=f'Ещё {i}', text='Текст', slug=f'more-{i}',
+                 author=cls.author)
+            for i in range(30)
+        )
+
+    def test_pages_within_budget(self):
+        pages = (
+            ('notes:home', ()),
+            ('notes:list', ()),
+            ('notes:add', ()),
+            ('notes:success', ()),
+            ('notes:import', ()),
+            ('notes:detail', (self.note.slug,)),
+            ('notes:edit', (self.note.slug,)),
+            ('notes:delete', (self.note.slug,)),
+        )
+        for name, args in pages:
+            with self.subTest(name=name):
+                self.assert_within_budget(self.author_client, name, args)
+
+    def test_search_and_export_within_budget(self):
+        self.assert_within_budget(
+            self.author_client, 'notes:search', data={'q': 'заметка'}
+        )
+        self.assert_within_budget(
+            self.author_client, 'notes:export', data={'format': 'csv'}
+        )
+
+    def test_fingerprint_hides_values(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (1, 2) AND s = 'a''b'"),
+            fingerprint("SELECT * FROM t WHERE id IN (7) AND s = 'x'")
+        )
+
+    def test_exceeded_budget_reports_repeated_queries(self):
+        notes = [Note.objects.get(pk=note.pk) for note in self.notes]
+
+        def n_plus_one(view):
+            return [Note.objects.get(pk=note.pk) for note in notes]
+
+        with mock.patch.object(NotesList, 'get_queryset', n_plus_one):
+            _, error = measure(
+                self.author_client, 'notes:list', reverse('notes:list')
+            )
+        self.assertTrue(error.startswith(
+            f'notes:list: {len(notes)} запросов '
+            f'(бюджет {BUDGETS["notes:list"].queries})'
+        ))
+        self.assertIn(f'{len(notes)} × SELECT', error)
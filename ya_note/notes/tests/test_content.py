@@ -1,4 +1,11 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
 from notes.forms import NoteForm
+from notes.models import Note
 from .common import NotesTestBase, NOTES_COUNT
 
 
@@ -22,6 +29,26 @@ class TestNotesListPage(NotesTestBase):
             all(note.author == self.reader for note in object_list)
         )
 
+    def test_list_does_not_load_note_text(self):
+        response = self.author_client.get(self.list_url)
+        for note in response.context['object_list']:
+            self.assertIn('text', note.get_deferred_fields())
+
+    @override_settings(NOTES_PER_PAGE=4)
+    def test_notes_are_paginated_by_id(self):
+        response = self.author_client.get(self.list_url)
+        first_page = response.context['object_list']
+        self.assertEqual(len(first_page), 4)
+        response = self.author_client.get(
+            self.list_url, {'after': response.context['next_after']}
+        )
+        second_page = response.context['object_list']
+        self.assertIsNone(response.context['next_after'])
+        self.assertEqual(
+            [note.id for note in first_page + second_page],
+            [note.id for note in self.notes]
+        )
+
 
 class TestNoteDetailPage(NotesTestBase):
     def test_note_detail_page(self):
@@ -44,3 +71,55 @@ class TestNoteEditPage(NotesTestBase):
         self.assertContains(response, '<form')
         self.assertContains(response, f'value="{self.note.title}"')
         self.assertIsInstance(response.context['form'], NoteForm)
+
+
+class TestNoteSearchPage(NotesTestBase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.search_url = reverse('notes:search')
+        cls.penguin_note = Note.objects.create(
+            title='Птицы',
+            text='Пингвины живут в Антарктиде & не летают',
+            slug='birds',
+            author=cls.author
+        )
+
+    def search(self, client, query):
+        response = client.get(self.search_url, {'q': query})
+        return response.context['object_list']
+
+    def test_search_finds_note_with_highlight(self):
+        results = self.search(self.author_client, 'пингвин')
+        self.assertEqual([note.pk for note in results], [self.penguin_note.pk])
+        self.assertIn('<mark>Пингвины</mark>', results[0].snippet)
+        self.assertIn('&amp;', results[0].snippet)
+
+    def test_search_is_scoped_to_author(self):
+        self.assertEqual(self.search(self.reader_client, 'пингвины'), [])
+
+    def test_title_matches_rank_first(self):
+        Note.objects.create(
+            title='Заметка о разном',
+            text='Немного про птицы и не только',
+            slug='misc',
+            author=self.author
+        )
+        results = self.search(self.author_client, 'птицы')
+        self.assertEqual(results[0].pk, self.penguin_note.pk)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.penguin_note.text = 'Теперь про тюленей'
+        self.penguin_note.save()
+        self.assertEqual(self.search(self.author_client, 'пингвины'), [])
+        self.assertEqual(len(self.search(self.author_client, 'тюленей')), 1)
+        self.penguin_note.delete()
+        self.assertEqual(self.search(self.author_client, 'тюленей'), [])
+
+    def test_query_syntax_characters_are_ignored(self):
+        results = self.search(self.author_client, '"пингвины*) -(')
+        self.assertEqual(len(results), 1)
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search(self.author_client, 'пингвины')), 1)
@@ -0,0 +1,108 @@
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase
+
+from yanote.db import pool
+from yanote.db.base import DatabaseWrapper
+from yanote.metrics import collect, render_text
+
+
+class TestDatabaseWrapper(SimpleTestCase):
+    databases = {'default'}
+
+    def open_database(self, **options):
+        wrapper = DatabaseWrapper(
+            {**connections['default'].settings_dict, 'NAME': self.path,
+             'OPTIONS': options},
+            alias='tuned'
+        )
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper.cursor()
+
+    def setUp(self):
+        directory = self.enterContext(TemporaryDirectory())
+        self.path = Path(directory) / 'db.sqlite3'
+
+    def test_new_connection_applies_pragmas(self):
+        cursor = self.open_database(pragmas={'temp_store': None})
+        for name, expected in (
+            ('journal_mode', 'wal'), ('synchronous', 1),
+            ('busy_timeout', 5000), ('temp_store', 0),
+        ):
+            with self.subTest(name=name):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_read_only_connection_rejects_writes(self):
+        primary = self.open_database()
+        replica = self.open_database(read_only=True)
+        primary.execute('CREATE TABLE note (title TEXT)')
+        primary.execute("INSERT INTO note VALUES ('Заметка')")
+        replica.execute('SELECT title FROM note')
+        self.assertEqual(replica.fetchall(), [('Заметка',)])
+        with self.assertRaises(OperationalError):
+            replica.execute("INSERT INTO note VALUES ('Реплика')")
+
+    def test_pool_reuses_connections_and_reports_stats(self):
+        self.addCleanup(self.drop_pools)
+        wrapper = DatabaseWrapper(
+            {**connections['default'].settings_dict, 'NAME': self.path,
+             'OPTIONS': {'pool': {'max_size': 1, 'timeout': 0.01}}},
+            alias='tuned'
+        )
+        wrapper.ensure_connection()
+        connection = wrapper.connection
+        with self.assertRaises(OperationalError):
+            self.open_database(pool={'max_size': 1, 'timeout': 0.01})
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, connection)
+        self.assertIn(
+            'db_pool_waits_total{alias="tuned"} 1', render_text(collect())
+        )
+        wrapper.close()
+
+    def test_pool_grows_past_idle_limit(self):
+        self.addCleanup(self.drop_pools)
+        settings_dict = {
+            **connections['default'].settings_dict, 'NAME': self.path,
+            'OPTIONS': {'pool': {'max_idle': 2}},
+        }
+        barrier = threading.Barrier(5)
+        errors = []
+
+        def hold_connection():
+            try:
+                wrapper = DatabaseWrapper(settings_dict, alias='tuned')
+                wrapper.ensure_connection()
+                barrier.wait(timeout=5)
+                wrapper.close()
+            except Exception as error:
+                errors.append(error)
+                barrier.abort()
+
+        threads = [threading.Thread(target=hold_connection) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(pool.pool_stats()['tuned'], {
+            'in_use': 0, 'idle': 2, 'waits': 0, 'wait_seconds': 0
+        })
+
+    def test_configured_pools_are_bounded(self):
+        for alias in connections:
+            options = connections[alias].settings_dict['OPTIONS'].get('pool')
+            if options:
+                options = {} if options is True else options
+                self.assertTrue({**pool.DEFAULT_POOL, **options}['max_size'])
+
+    def drop_pools(self):
+        for key in [key for key in pool.POOLS if key[0] == 'tuned']:
+            for connection in pool.POOLS.pop(key).idle:
+                connection.close()
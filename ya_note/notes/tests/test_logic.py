@@ -1,10 +1,23 @@
+import json
 from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.db import IntegrityError
+from django.db.models import Count
+from django.test import TestCase
 from django.urls import reverse
 from pytils.translit import slugify
 
+from notes.forms import WARNING, NoteForm
 from notes.models import Note
+from notes.slugs import (
+    DEFAULT_SLUG, slugify_title, slugify_titles, taken_slugs
+)
 from .common import (
     NotesTestBase,
     ADD_URL,
@@ -14,7 +27,8 @@ from .common import (
     CREATED_NOTE_SLUG,
     CREATED_NOTE_TITLE,
     ANON_NOTE_TITLE,
-    ANON_NOTE_TEXT
+    ANON_NOTE_TEXT,
+    User
 )
 
 
@@ -103,3 +117,202 @@ class TestNoteAccessLogic(NotesTestBase):
         note = Note.objects.get(title=ANON_NOTE_TITLE)
         expected_slug = slugify(ANON_NOTE_TITLE)
         self.assertEqual(note.slug, expected_slug)
+
+
+class TestSlugAllocation(NotesTestBase):
+    TITLE = 'Одинаковый заголовок'
+
+    def test_duplicate_titles_get_numbered_slugs(self):
+        slugs = [
+            Note.objects.create(
+                title=self.TITLE, text='Текст', author=self.author
+            ).slug
+            for _ in range(3)
+        ]
+        base = slugify(self.TITLE)
+        self.assertEqual(slugs, [base, f'{base}-2', f'{base}-3'])
+
+    def test_only_variants_of_base_are_read(self):
+        for slug in ('memo-2', 'memobook', 'memos-on-x', 'memo-book'):
+            Note.objects.create(
+                title=slug, text='Текст', slug=slug, author=self.author
+            )
+        self.assertEqual(
+            taken_slugs(Note.objects.all(), 'memo', 100),
+            {'memo-2', 'memo-book'}
+        )
+
+    def test_slug_taken_by_concurrent_writer_is_retried(self):
+        taken_slug = self.note.slug
+        with mock.patch(
+            'notes.slugs.free_slug',
+            side_effect=[taken_slug, 'free-slug']
+        ):
+            note = Note.objects.create(
+                title=self.TITLE, text='Текст', author=self.author
+            )
+        self.assertEqual(note.slug, 'free-slug')
+
+    def test_explicit_slug_race_shows_form_error(self):
+        # Обе проверки формы прошли до того, как slug занял другой запрос.
+        notes_before = Note.objects.count()
+        with mock.patch.object(
+            NoteForm,
+            'clean_slug',
+            lambda form: form.cleaned_data['slug']
+        ), mock.patch.object(NoteForm, 'validate_unique'):
+            response = self.author_client.post(ADD_URL, data={
+                'title': self.TITLE,
+                'text': 'Текст',
+                'slug': self.note.slug,
+            })
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(
+            response.context['form'], 'slug', self.note.slug + WARNING
+        )
+        self.assertEqual(Note.objects.count(), notes_before)
+
+
+class TestSlugService(TestCase):
+    TITLES = (
+        'Заметка о чём-то',
+        'Щука & ёжик — «друзья»…',
+        '  Пробелы   и -- дефисы ',
+        'Latin Title 42',
+        'Ъ',
+        'Ноль\x00внутри',
+        'Ноль \x00 с пробелами',
+    )
+
+    def test_titles_slugify_like_pytils(self):
+        for title in self.TITLES:
+            with self.subTest(title=title):
+                self.assertEqual(
+                    slugify_title(title), slugify(title) or DEFAULT_SLUG
+                )
+
+    def test_bulk_mode_matches_single_titles(self):
+        self.assertEqual(
+            slugify_titles(self.TITLES),
+            [slugify_title(title) for title in self.TITLES]
+        )
+
+    def test_nul_in_title_does_not_shift_batch(self):
+        self.assertEqual(
+            slugify_titles(['a\x00b', 'second']), ['ab', 'second']
+        )
+
+
+class TestNotesTransfer(NotesTestBase):
+    IMPORT_URL = reverse('notes:import')
+    EXPORT_URL = reverse('notes:export')
+
+    def upload(self, name, content, file_format):
+        return self.reader_client.post(self.IMPORT_URL, data={
+            'file': SimpleUploadedFile(name, content.encode()),
+            'format': file_format,
+        })
+
+    def test_ndjson_import_allocates_unique_slugs(self):
+        lines = [
+            {'title': 'Импорт', 'text': 'Первая'},
+            {'title': 'Импорт', 'text': 'Вторая'},
+            {'title': 'Своя', 'text': 'Третья', 'slug': self.note.slug},
+        ]
+        response = self.upload(
+            'notes.ndjson',
+            '\n'.join(json.dumps(line) for line in lines),
+            'ndjson'
+        )
+        self.assertRedirects(response, SUCCESS_URL)
+        slugs = list(
+            Note.objects.filter(author=self.reader).order_by('id')
+            .values_list('slug', flat=True)
+        )
+        self.assertEqual(
+            slugs, ['import', 'import-2', f'{self.note.slug}-2']
+        )
+
+    def test_csv_import_in_batches(self):
+        rows = '\n'.join(f'Заметка {i},"Текст, {i}",' for i in range(5))
+        with self.settings(NOTES_TRANSFER_BATCH_SIZE=2):
+            self.upload('notes.csv', 'title,text,slug\n' + rows, 'csv')
+        texts = Note.objects.filter(author=self.reader).values_list(
+            'text', flat=True
+        )
+        self.assertEqual(sorted(texts), [f'Текст, {i}' for i in range(5)])
+
+    def test_broken_file_is_rejected(self):
+        response = self.upload('notes.ndjson', '{"title": ', 'ndjson')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('error', response.context)
+        self.assertFalse(Note.objects.filter(author=self.reader).exists())
+
+    def test_invalid_rows_are_rejected(self):
+        for line in ('{"title": 5}', '{"title": "Т", "slug": "has space/x"}'):
+            with self.subTest(line=line):
+                response = self.upload('notes.ndjson', line, 'ndjson')
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('Строка 1', response.context['error'])
+        self.assertFalse(Note.objects.filter(author=self.reader).exists())
+
+    def test_failed_import_reports_progress(self):
+        lines = [json.dumps({'title': f'Заметка {i}'}) for i in range(4)]
+        lines.append('{"title": 5}')
+        with self.settings(NOTES_TRANSFER_BATCH_SIZE=2):
+            response = self.upload('notes.ndjson', '\n'.join(lines), 'ndjson')
+        error = response.context['error']
+        self.assertIn('Строка 5', error)
+        self.assertIn('Импортировано заметок: 4', error)
+        self.assertEqual(Note.objects.filter(author=self.reader).count(), 4)
+
+    def test_export_round_trip(self):
+        for file_format in ('ndjson', 'csv'):
+            with self.subTest(file_format=file_format):
+                response = self.author_client.get(
+                    self.EXPORT_URL, {'format': file_format}
+                )
+                content = b''.join(response.streaming_content).decode()
+                Note.objects.filter(author=self.reader).delete()
+                self.upload(f'notes.{file_format}', content, file_format)
+                imported = Note.objects.filter(author=self.reader)
+                self.assertEqual(
+                    sorted(imported.values_list('title', flat=True)),
+                    sorted(note.title for note in self.notes)
+                )
+
+    def test_import_command(self):
+        path = Path(self.enterContext(TemporaryDirectory())) / 'notes.ndjson'
+        path.write_text(json.dumps({'title': 'Из файла', 'text': 'Текст'}))
+        call_command(
+            'import_notes', str(path), author=self.reader.username,
+            stdout=StringIO()
+        )
+        self.assertTrue(
+            Note.objects.filter(author=self.reader, title='Из файла').exists()
+        )
+
+
+class TestCorpusGenerator(TestCase):
+    OPTIONS = {'users': 5, 'notes': 300, 'batch_size': 64}
+
+    def generate(self, seed):
+        call_command(
+            'generate_corpus', seed=seed, stdout=StringIO(), **self.OPTIONS
+        )
+        return list(Note.objects.order_by('id').values_list(
+            'author__username', 'title', 'text', 'slug'
+        ))
+
+    def test_corpus_is_deterministic_and_skewed(self):
+        first = self.generate(seed=3)
+        User.objects.all().delete()
+        self.assertEqual(self.generate(seed=3), first)
+        self.assertEqual(len({note[3] for note in first}), 300)
+        per_author = sorted(
+            User.objects.annotate(count=Count('note')).values_list(
+                'count', flat=True
+            ),
+            reverse=True
+        )
+        self.assertGreater(per_author[0], 3 * per_author[-1])
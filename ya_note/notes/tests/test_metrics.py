@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from http import HTTPStatus
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.test import override_settings
+from django.urls import reverse
+
+from yanote import metrics
+from .common import ADD_URL, NotesTestBase
+
+
+def sample(name, **labels):
+    """Текущее значение серии; метки — в порядке объявления метрики."""
+    text = metrics.render_text(metrics.collect())
+    label_text = metrics.format_labels(labels, labels.values())
+    match = re.search(
+        rf'^{re.escape(name + label_text)} (\S+)$', text, re.MULTILINE
+    )
+    return float(match[1]) if match else 0
+
+
+class TestMetrics(NotesTestBase):
+    def test_requests_and_queries_are_counted_per_view(self):
+        labels = {'view': 'notes:list', 'method': 'GET', 'status': '200'}
+        before = sample('http_requests_total', **labels)
+        queries = sample('db_queries_total', view='notes:list')
+        self.author_client.get(self.list_url)
+        with override_settings(METRICS_TOKEN='секрет'):
+            response = self.client.get(
+                reverse('metrics'), headers={'Authorization': 'Bearer секрет'}
+            )
+        self.assertTrue(
+            response['Content-Type'].startswith('text/plain; version=0.0.4')
+        )
+        self.assertIn(
+            '# TYPE http_request_duration_seconds histogram',
+            response.content.decode()
+        )
+        self.assertEqual(sample('http_requests_total', **labels), before + 1)
+        self.assertGreater(
+            sample('db_queries_total', view='notes:list'), queries
+        )
+
+    def test_slug_cache_is_reported(self):
+        name = 'notes_slug_cache_requests_total'
+        requests = sample(name, result='hit') + sample(name, result='miss')
+        self.author_client.post(
+            ADD_URL, data={'title': 'Без адреса', 'text': 'Текст'}
+        )
+        self.assertEqual(
+            sample(name, result='hit') + sample(name, result='miss'),
+            requests + 1
+        )
+
+    def test_metrics_are_not_public(self):
+        url = reverse('metrics')
+        with override_settings(METRICS_TOKEN='секрет'):
+            for client, headers in (
+                (self.client, {}),
+                (self.author_client, {}),
+                (self.client, {'Authorization': 'Bearer чужой'}),
+            ):
+                with self.subTest(headers=headers):
+                    self.assertEqual(
+                        client.get(url, headers=headers).status_code,
+                        HTTPStatus.FORBIDDEN
+                    )
+        self.author.is_staff = True
+        self.author.save()
+        self.assertEqual(
+            self.author_client.get(url).status_code, HTTPStatus.OK
+        )
+
+    def test_processes_are_aggregated_through_directory(self):
+        directory = Path(self.enterContext(TemporaryDirectory()))
+        with override_settings(METRICS_DIR=directory):
+            own = sample('notes_imported_total', format='csv')
+            (directory / f'{os.getppid()}.json').write_text(json.dumps({
+                'notes_imported_total': [[['csv'], 7]],
+            }))
+            self.assertEqual(
+                sample('notes_imported_total', format='csv'), own + 7
+            )
+
+    def test_dead_process_counters_are_retired(self):
+        directory = Path(self.enterContext(TemporaryDirectory()))
+        # pid только что завершившегося процесса.
+        dead = subprocess.run(
+            [sys.executable, '-c', 'import os; print(os.getpid())'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        with override_settings(METRICS_DIR=directory):
+            own = sample('notes_imported_total', format='csv')
+            (directory / f'{dead}.json').write_text(json.dumps({
+                'notes_imported_total': [[['csv'], 7]],
+                'db_pool_connections': [[['default', 'idle'], 3]],
+            }))
+            self.assertEqual(
+                sample('notes_imported_total', format='csv'), own + 7
+            )
+            self.assertEqual(
+                sample('db_pool_connections', alias='default', state='idle'),
+                0
+            )
+            self.assertEqual(
+                sorted(path.name for path in directory.glob('*.json')),
+                [f'{os.getpid()}.json', 'retired.json']
+            )
+            self.assertEqual(
+                sample('notes_imported_total', format='csv'), own + 7
+            )
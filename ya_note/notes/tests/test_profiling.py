@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from yanote import profiling
+from .common import NotesTestBase, User
+
+
+class TestProfiling(NotesTestBase):
+    def setUp(self):
+        super().setUp()
+        profiling.TRACES.clear()
+
+    def test_requests_are_not_traced_by_default(self):
+        self.author_client.get(self.detail_url)
+        self.assertFalse(profiling.TRACES)
+
+    def test_sampled_request_has_timeline(self):
+        path = Path(self.enterContext(TemporaryDirectory())) / 'traces.jsonl'
+        with override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_FILE=path):
+            self.author_client.get(self.list_url)
+        trace = profiling.TRACES[-1]
+        self.assertEqual(
+            (trace['method'], trace['path'], trace['status']),
+            ('GET', self.list_url, 200)
+        )
+        kinds = {}
+        for event in trace['events']:
+            kinds.setdefault(event['kind'], []).append(event)
+        self.assertEqual(
+            [event['name'] for event in kinds['view']],
+            ['notes.views.NotesList']
+        )
+        self.assertEqual(trace['queries'], len(kinds['sql']))
+        self.assertIn(
+            'notes/views.py', {
+                event['origin'].split(':')[0] for event in kinds['sql']
+                if event['origin']
+            }
+        )
+        self.assertIn(
+            'notes/list.html', {event['name'] for event in kinds['template']}
+        )
+        saved = json.loads(path.read_text().splitlines()[-1])
+        self.assertEqual(saved['id'], trace['id'])
+
+    def test_traces_page_is_for_staff_only(self):
+        url = reverse('traces')
+        self.assertEqual(self.author_client.get(url).status_code, 302)
+        self.author_client.force_login(
+            User.objects.create_user(username='Админ', is_staff=True)
+        )
+        self.assertEqual(self.author_client.get(url).status_code, 200)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    async def test_asgi_request_trace_has_sql(self):
+        # Под ASGI представление и ORM работают в потоке sync_to_async.
+        client = AsyncClient()
+        await client.aforce_login(self.author)
+        await client.get(self.list_url)
+        trace = profiling.TRACES[-1]
+        self.assertEqual(trace['status'], 200)
+        self.assertGreater(trace['queries'], 0)
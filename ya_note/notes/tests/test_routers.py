@@ -0,0 +1,65 @@
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+from yanote.routers import PIN_COOKIE
+from .budgets import capture_queries
+from .common import LIST_URL, LOCAL_CACHES, User
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TestReplicaRouting(TransactionTestCase):
+    # Транзакции теста нет, поэтому реплика видит данные default.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Автор')
+        self.note = Note.objects.create(
+            title='Заметка', text='Текст', slug='note', author=self.author
+        )
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def queries_by_alias(self, method, url, **kwargs):
+        with (
+            CaptureQueriesContext(connections['default']) as default,
+            CaptureQueriesContext(connections['replica']) as replica,
+        ):
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, len(default), len(replica)
+
+    def test_read_only_pages_read_from_replica(self):
+        for url in (LIST_URL, reverse('notes:detail', args=('note',))):
+            with self.subTest(url=url):
+                response, default, replica = self.queries_by_alias(
+                    'get', url
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(default, 0)
+                self.assertGreater(replica, 0)
+
+    def test_other_pages_read_from_default(self):
+        _, _, replica = self.queries_by_alias(
+            'get', reverse('notes:edit', args=('note',))
+        )
+        self.assertEqual(replica, 0)
+
+    def test_reads_are_pinned_to_default_after_write(self):
+        response, _, replica = self.queries_by_alias(
+            'post', reverse('notes:edit', args=('note',)),
+            data={'title': 'Новое название', 'text': 'Текст', 'slug': 'note'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(replica, 0)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response, _, replica = self.queries_by_alias('get', LIST_URL)
+        self.assertEqual(replica, 0)
+        self.assertContains(response, 'Новое название')
+
+    def test_budgets_count_replica_queries(self):
+        with capture_queries() as queries:
+            _, default, replica = self.queries_by_alias('get', LIST_URL)
+        self.assertGreater(replica, 0)
+        self.assertEqual(len(queries), default + replica)
@@ -0,0 +1,184 @@
+"""
+Массовый импорт и экспорт заметок в NDJSON и CSV.
+
+Импорт читает файл построчно и пишет пачками: память зависит от размера
+пачки, а не файла. Каждая пачка коммитится сразу, поэтому импорт не «всё
+или ничего»: при ошибке в строке N пачки до неё остаются в базе, а
+TransferError сообщает, сколько заметок уже импортировано и на какой
+строке импорт остановился. Экспорт отдаёт строки генератором поверх
+курсора базы.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import IntegrityError, transaction
+
+from .metrics import NOTES_IMPORTED
+from .models import Note
+from .slugs import SLUG_ATTEMPTS, allocate_slugs, slugify_titles
+
+FIELDS = ('title', 'text', 'slug')
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class TransferError(ValueError):
+    """
+    Файл импорта не удалось разобрать.
+
+    line — номер строки с ошибкой, если он известен; imported — сколько
+    заметок из предыдущих пачек уже записано в базу.
+    """
+
+    def __init__(self, message, line=None, imported=0):
+        super().__init__(message)
+        self.line = line
+        self.imported = imported
+
+    def __str__(self):
+        message = super().__str__()
+        if self.line is not None:
+            message = f'Строка {self.line}: {message}'
+        if self.imported:
+            message += (
+                f' Импортировано заметок: {self.imported}, '
+                'импорт остановлен на этой строке.'
+                if self.line is not None else
+                f' Импортировано заметок до ошибки: {self.imported}.'
+            )
+        return message
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def clean_row(row, number):
+    """Поля строки — строки или пусты, slug годится для адреса."""
+    for field in FIELDS:
+        value = row.get(field)
+        if value is not None and not isinstance(value, str):
+            raise TransferError(
+                f'поле {field} должно быть строкой.', line=number
+            )
+    if row.get('slug'):
+        try:
+            validate_slug(row['slug'])
+        except ValidationError:
+            raise TransferError(
+                f'недопустимый slug «{row["slug"]}».', line=number
+            )
+    return row
+
+
+def read_ndjson(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise TransferError(str(error), line=number)
+        if not isinstance(row, dict):
+            raise TransferError('ожидался объект.', line=number)
+        yield clean_row(row, number)
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield clean_row(row, reader.line_num)
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def build_notes(rows, author):
+    """
+    Заметки для одной пачки строк.
+
+    Slug из файла используется как основа, пустой получается из
+    заголовка; уникальность для всей пачки проверяется разом.
+    """
+    title_field = Note._meta.get_field('title')
+    slug_length = Note._meta.get_field('slug').max_length
+    titles = [
+        (row.get('title') or title_field.default)[:title_field.max_length]
+        for row in rows
+    ]
+    generated = iter(slugify_titles(
+        [title for title, row in zip(titles, rows) if not row.get('slug')]
+    ))
+    bases = [row.get('slug') or next(generated) for row in rows]
+    slugs = allocate_slugs(Note.objects.all(), bases, slug_length)
+    return [
+        Note(title=title, text=row.get('text') or '', slug=slug, author=author)
+        for title, slug, row in zip(titles, slugs, rows)
+    ]
+
+
+def import_notes(lines, file_format, author, batch_size):
+    """
+    Импортируем заметки из итератора строк, возвращаем их количество.
+
+    Каждая пачка пишется своей транзакцией через bulk_create. Если slug
+    из пачки успел занять параллельный запрос, пачка собирается заново.
+    Ошибка разбора файла прерывает импорт на пачке с ошибкой; записанные
+    раньше пачки остаются, их число — в TransferError.imported.
+    """
+    if file_format not in READERS:
+        raise TransferError(f'Неизвестный формат: {file_format}.')
+    imported = 0
+    try:
+        for rows in chunked(READERS[file_format](lines), batch_size):
+            for attempt in range(SLUG_ATTEMPTS):
+                try:
+                    with transaction.atomic():
+                        Note.objects.bulk_create(
+                            build_notes(rows, author), batch_size=batch_size
+                        )
+                    break
+                except IntegrityError:
+                    if attempt == SLUG_ATTEMPTS - 1:
+                        raise
+            imported += len(rows)
+            NOTES_IMPORTED.inc(file_format, amount=len(rows))
+    except TransferError as error:
+        error.imported = imported
+        raise
+    except (UnicodeDecodeError, csv.Error) as error:
+        raise TransferError(str(error), imported=imported) from error
+    return imported
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def export_notes(author, file_format, chunk_size):
+    """Строки файла экспорта по одной, без загрузки всех заметок."""
+    rows = Note.objects.filter(author=author).order_by('id').values_list(
+        *FIELDS
+    ).iterator(chunk_size=chunk_size)
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n'
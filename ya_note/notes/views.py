@@ -1,9 +1,20 @@
+import io
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import BadRequest
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views import generic
 
-from .forms import NoteForm
+from .forms import WARNING, NoteForm
 from .models import Note
+from .search import search_notes
+from .transfer import (
+    CONTENT_TYPES, FORMATS, TransferError, export_notes, import_notes
+)
 
 
 class Home(generic.TemplateView):
@@ -26,22 +37,36 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormBase(NoteBase):
+    """Базовый класс для создания и редактирования заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """
+        Slug, прошедший проверку формы, мог успеть занять другой запрос.
+
+        В этом случае показываем ту же ошибку, что и при обычной проверке,
+        а не падаем с ошибкой сервера.
+        """
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            form.add_error('slug', form.instance.slug + WARNING)
+            return self.form_invalid(form)
+
+
+class NoteCreate(NoteFormBase, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteFormBase, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -52,8 +77,111 @@ class NoteDelete(NoteBase, generic.DeleteView):
 class NotesList(NoteBase, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
+    read_replica = True
+
+    def get_queryset(self):
+        """
+        Страница заметок после id из параметра after.
+
+        Порядок (author_id, id) совпадает с индексом, поэтому страница
+        читается из индекса без сортировки. Текст заметок списку не нужен
+        и не загружается.
+        """
+        queryset = super().get_queryset().only(
+            'title', 'slug', 'author'
+        ).order_by('id')
+        after = self.request.GET.get('after')
+        if after:
+            try:
+                queryset = queryset.filter(id__gt=int(after))
+            except ValueError:
+                raise BadRequest('Некорректный курсор.')
+        # Одна лишняя запись показывает, есть ли следующая страница.
+        return queryset[:settings.NOTES_PER_PAGE + 1]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        notes = list(context['object_list'])
+        context['next_after'] = None
+        if len(notes) > settings.NOTES_PER_PAGE:
+            notes = notes[:settings.NOTES_PER_PAGE]
+            context['next_after'] = notes[-1].id
+        context['object_list'] = context['note_list'] = notes
+        return context
 
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+    read_replica = True
+
+
+class NoteSearch(LoginRequiredMixin, generic.ListView):
+    """Поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        return search_notes(
+            self.request.user,
+            self.request.GET.get('q', ''),
+            settings.NOTES_PER_PAGE
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+class NoteImport(LoginRequiredMixin, generic.TemplateView):
+    """Импорт заметок из файла NDJSON или CSV."""
+    template_name = 'notes/import.html'
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        file_format = request.POST.get('format')
+        if upload is None or file_format not in FORMATS:
+            return self.render_to_response(self.get_context_data(
+                error='Выберите файл и его формат.'
+            ))
+        # Файл читается построчно прямо из загрузки: большие файлы Django
+        # складывает во временный файл на диске, а не в память.
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        try:
+            import_notes(
+                lines,
+                file_format,
+                request.user,
+                settings.NOTES_TRANSFER_BATCH_SIZE
+            )
+        except TransferError as error:
+            return self.render_to_response(self.get_context_data(
+                error=f'Не удалось импортировать файл: {error}'
+            ))
+        return redirect('notes:success')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['formats'] = FORMATS
+        return context
+
+
+class NoteExport(LoginRequiredMixin, generic.View):
+    """Выгрузка всех заметок пользователя."""
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get('format', FORMATS[0])
+        if file_format not in FORMATS:
+            raise BadRequest('Неизвестный формат.')
+        response = StreamingHttpResponse(
+            export_notes(
+                request.user,
+                file_format,
+                settings.NOTES_TRANSFER_BATCH_SIZE
+            ),
+            content_type=CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{file_format}"'
+        )
+        return response
@@ -0,0 +1,73 @@
+"""
+Пользователь запроса из кэша вместо запроса к базе.
+
+CachedAuthenticationMiddleware заменяет AuthenticationMiddleware: объект
+пользователя берётся из кэша по id из сессии и принимается, только если
+хэш пароля в сессии совпадает с хэшем закэшированного пользователя.
+Иначе, как и при промахе, пользователь загружается стандартной
+django.contrib.auth.get_user, которая и разлогинит сессию со старым
+паролем. Запись пользователя сбрасывается при его сохранении и удалении
+(см. signals) и при выходе через users.views.user_logout.
+Пользователи лежат в кэше сессий (SESSION_CACHE_ALIAS), а не в default.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def user_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def forget_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
+
+
+def load_user(request):
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    if user_id is None:
+        return auth.get_user(request)
+    key = user_cache_key(user_id)
+    cache = user_cache()
+    user = cache.get(key)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if (
+        user is not None
+        and session.get(auth.BACKEND_SESSION_KEY)
+        in settings.AUTHENTICATION_BACKENDS
+        and session_hash
+        and constant_time_compare(session_hash, user.get_session_auth_hash())
+    ):
+        return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = load_user(request)
+    return request._cached_user
+
+
+async def auser(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sync_to_async(load_user)(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = lambda: auser(request)
@@ -0,0 +1,58 @@
+"""
+Сессии в кэше с отложенной записью в базу.
+
+SESSION_ENGINE = 'users.sessions'. Сессия читается из кэша и только при
+промахе — из базы, как в cached_db. Запись в кэш идёт всегда, а в базу —
+сразу только при создании сессии и при смене входа (пользователь, бэкенд,
+хэш пароля); прочие изменения доходят до базы не чаще раза в
+SESSION_DB_WRITE_INTERVAL секунд. Если кэш потеряет сессию раньше, эти
+прочие изменения пропадут, а вход сохранится. Несколько процессов должны
+делить один кэш (не LocMemCache), иначе процесс без сессии в кэше
+прочитает из базы её устаревшую копию.
+"""
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY
+)
+from django.contrib.sessions.backends import cached_db
+
+AUTH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+
+
+def auth_values(data):
+    return tuple(data.get(key) for key in AUTH_KEYS)
+
+
+class SessionStore(cached_db.SessionStore):
+    @property
+    def written_key(self):
+        return f'{self.cache_key}:db'
+
+    def load(self):
+        data = super().load()
+        self.stored_auth = auth_values(data)
+        return data
+
+    def save(self, must_create=False):
+        data = self._get_session(no_load=must_create)
+        if (
+            not must_create
+            and auth_values(data) == getattr(self, 'stored_auth', None)
+            and self._cache.get(self.written_key)
+        ):
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+            return
+        super().save(must_create)
+        self.stored_auth = auth_values(data)
+        self._cache.set(
+            self.written_key, True, settings.SESSION_DB_WRITE_INTERVAL
+        )
+
+    def delete(self, session_key=None):
+        if session_key is None and self.session_key is not None:
+            session_key = self.session_key
+        if session_key is not None:
+            self._cache.delete(f'{self.cache_key_prefix}{session_key}:db')
+        super().delete(session_key)
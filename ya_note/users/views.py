@@ -2,8 +2,11 @@ from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 
+from .auth import forget_user
+
 
 @login_required
 def user_logout(request):
+    forget_user(request.user.pk)
     logout(request)
     return render(request, 'registration/logout.html')
@@ -0,0 +1,134 @@
+"""
+Пул соединений SQLite внутри процесса.
+
+Django закрывает соединение в конце каждого запроса; с пулом оно
+возвращается в пул и достаётся следующему запросу любого потока, так
+что открытие файла и PRAGMA выполняются один раз на соединение, а не на
+запрос. Перед выдачей соединение проверяется запросом SELECT 1.
+
+Пул хранит не больше max_idle свободных соединений, лишние закрываются,
+а открытых держит не больше max_size: сверх него запрос ждёт
+освобождения соединения не дольше timeout и получает PoolTimeout — это
+сигнал перегрузки процесса. Под ASGI запрос держит соединение, пока
+медленный клиент читает ответ, поэтому max_size должен покрывать число
+одновременных запросов процесса (потоков или соединений ASGI).
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Пример: OPTIONS = {'pool': {'max_idle': 8, 'max_size': 32}}; True —
+# значения по умолчанию.
+DEFAULT_POOL = {'max_idle': 8, 'max_size': 64, 'timeout': 10}
+
+POOLS = {}
+_pools_lock = threading.Lock()
+# Соединения родителя после fork не закрываем: закрытие в дочернем
+# процессе снимет блокировки файла, которые держит родитель.
+_inherited = []
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Django обернёт её в django.db.OperationalError."""
+
+
+class Pool:
+    def __init__(self, max_idle, max_size, timeout):
+        self.max_idle = max_idle
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle = deque()
+        self.in_use = 0
+        self.waits = 0
+        self.wait_seconds = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, connect):
+        """Свободное рабочее соединение из пула или новое через connect()."""
+        with self.condition:
+            if not self.idle and self.full():
+                self.waits += 1
+                started = time.monotonic()
+                available = self.condition.wait_for(
+                    lambda: self.idle or not self.full(), self.timeout
+                )
+                self.wait_seconds += time.monotonic() - started
+                if not available:
+                    raise PoolTimeout(
+                        f'Все {self.max_size} соединений пула заняты '
+                        f'дольше {self.timeout} с.'
+                    )
+            connection = self.idle.pop() if self.idle else None
+            self.in_use += 1
+        try:
+            if connection is not None and not is_usable(connection):
+                connection.close()
+                connection = None
+            return connection or connect()
+        except BaseException:
+            self.release(None)
+            raise
+
+    def full(self):
+        return self.max_size is not None and self.in_use >= self.max_size
+
+    def release(self, connection):
+        """Возвращаем соединение; None — соединение выброшено."""
+        with self.condition:
+            self.in_use -= 1
+            if connection is not None and len(self.idle) < self.max_idle:
+                self.idle.append(connection)
+                connection = None
+            self.condition.notify()
+        if connection is not None:
+            connection.close()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'waits': self.waits,
+                'wait_seconds': self.wait_seconds,
+            }
+
+
+def is_usable(connection):
+    try:
+        connection.execute('SELECT 1')
+    except Exception:
+        return False
+    return True
+
+
+def get_pool(key, options):
+    with _pools_lock:
+        pool = POOLS.get(key)
+        if pool is None:
+            settings = DEFAULT_POOL if options is True else {
+                **DEFAULT_POOL, **options
+            }
+            pool = POOLS[key] = Pool(**settings)
+        return pool
+
+
+def pool_stats():
+    """Состояние пулов процесса, сложенное по псевдонимам баз."""
+    with _pools_lock:
+        pools = list(POOLS.items())
+    total = {}
+    for (alias, _), pool in pools:
+        stats = total.setdefault(alias, dict.fromkeys(pool.stats(), 0))
+        for name, value in pool.stats().items():
+            stats[name] += value
+    return total
+
+
+def _reset_after_fork():
+    _inherited.extend(POOLS.values())
+    POOLS.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
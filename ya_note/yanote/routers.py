@@ -0,0 +1,90 @@
+"""
+Чтение со страниц только для чтения — через соединение-реплику.
+
+Представление отмечается атрибутом read_replica = True. Для его GET и
+HEAD ReplicaMiddleware включает чтение из псевдонима READ_REPLICA_ALIAS,
+и ReplicaRouter направляет туда все чтения этого запроса; записи всегда
+идут в default. READ_REPLICA_ALIAS = None отключает разделение.
+
+После любого запроса, меняющего данные, клиент получает cookie на
+READ_REPLICA_PIN_SECONDS секунд, и пока она жива, его чтения тоже идут
+в default: пользователь сразу видит то, что сам записал, даже если
+реплика отстаёт.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — та же база, связи между объектами из неё допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def uses_replica(view_func):
+    view = getattr(view_func, 'view_class', view_func)
+    return getattr(view, 'read_replica', False)
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = read_alias.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.READ_REPLICA_ALIAS
+            and request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+            and uses_replica(view_func)
+        ):
+            read_alias.set(settings.READ_REPLICA_ALIAS)
+        return None
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.READ_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
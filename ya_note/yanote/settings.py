@@ -18,17 +18,21 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'notes.apps.NotesConfig'
+    'notes.apps.NotesConfig',
+    'users',
 ]
 
 MIDDLEWARE = [
+    'yanote.metrics.MetricsMiddleware',
+    'yanote.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'yanote.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'yanote.urls'
@@ -52,12 +56,65 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
 
+# PRAGMA соединений см. в yanote.db; OPTIONS['pragmas'] их переопределяет.
+# OPTIONS['pool'] держит соединения в пуле процесса (yanote.db.pool), поэтому
+# CONN_MAX_AGE остаётся 0: в конце запроса соединение уходит в пул.
+# max_size — одновременные запросы процесса с запасом: запросы сверх него
+# ждут соединения и после timeout получают PoolTimeout.
+# IMMEDIATE берёт блокировку записи в начале транзакции: иначе SQLite
+# при повышении блокировки сразу отвечает «database is locked», не
+# дожидаясь busy_timeout.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yanote.db',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pool': {'max_size': 64},
+        },
+    },
+    # Та же база, открытая только на чтение (mode=ro и query_only).
+    'replica': {
+        'ENGINE': 'yanote.db',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'read_only': True, 'pool': {'max_size': 64}},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
+DATABASE_ROUTERS = ['yanote.routers.ReplicaRouter']
+# Куда читают страницы с read_replica = True; None — всё читается из default.
+READ_REPLICA_ALIAS = 'replica'
+# Сколько секунд после записи чтения клиента идут в default, а не в реплику.
+READ_REPLICA_PIN_SECONDS = 5
+
+
+# Кэш общий для всех воркеров: сессии и пользователи в памяти одного
+# процесса другим не видны, и выход или смена пароля в одном воркере не
+# дошли бы до остальных.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+    # Сессии и пользователи — отдельно: вытеснение из default удалило бы
+    # сессию с ещё не записанными в базу изменениями. Предел взят с
+    # большим запасом над числом живых сессий, так что до чистки дело не
+    # доходит; просроченные записи удаляются при чтении.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10_000_000},
+    },
+}
+
+# Сессии и пользователь запроса читаются из кэша (users.sessions,
+# users.auth); изменения сессии, кроме входа и выхода, попадают в базу не
+# чаще раза в SESSION_DB_WRITE_INTERVAL секунд.
+SESSION_ENGINE = 'users.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_DB_WRITE_INTERVAL = 60
+USER_CACHE_TIMEOUT = 60 * 5
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -87,3 +144,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_PER_PAGE = 50
+NOTES_TRANSFER_BATCH_SIZE = 1000
+
+# Доля запросов, для которых пишется трасса SQL и шаблонов (0 — выключено).
+PROFILING_SAMPLE_RATE = 0
+# Сколько последних трасс держать в памяти процесса для /admin/traces/.
+PROFILING_BUFFER_SIZE = 100
+# Необязательный файл для трасс в JSON Lines с ротацией по размеру.
+PROFILING_FILE = None
+PROFILING_FILE_MAX_BYTES = 10 * 1024 * 1024
+PROFILING_FILE_BACKUP_COUNT = 3
+
+# Общий каталог для метрик процессов gunicorn; None — метрики /metrics/
+# только того процесса, который ответил.
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+# /metrics/ открыт сотрудникам и запросам с заголовком
+# Authorization: Bearer <METRICS_TOKEN>; None — только сотрудникам.
+METRICS_TOKEN = None
@@ -5,10 +5,14 @@ from django.urls import include, path
 from django.views.generic import CreateView
 
 from users.views import user_logout
+from yanote.metrics import metrics_view
+from yanote.profiling import trace_list
 
 urlpatterns = [
     path('', include('notes.urls')),
+    path('admin/traces/', trace_list, name='traces'),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 auth_urls = ([